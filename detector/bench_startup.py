@@ -0,0 +1,103 @@
+"""
+Startup-Time Benchmark
+Times the real command line, `smell_detector.py tiny.py`, in fresh
+interpreters with a warm and a cold config cache, against a bare
+`python -c pass`. Fails (exit code 1) when the warm run's overhead over the
+bare interpreter exceeds the budget, when importing smell_detector pulls in
+a deferred module, or when a warm run still imports yaml (the config cache
+was not used).
+Usage: python bench_startup.py [--budget-ms 150] [--runs 10]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Modules that must not be imported just by importing smell_detector
+DEFERRED_MODULES = ['yaml', 'argparse', 'tarfile', 'zipfile', 'sqlite3', 'mmap']
+# Modules a warm run on a plain .py file must not need
+WARM_RUN_EXCLUDED = ['yaml', 'tarfile', 'zipfile', 'sqlite3', 'mmap']
+
+
+def best_time_ms(command, runs, cwd, before=None):
+    """Run command in fresh interpreters; return the best wall-clock time in ms"""
+    best = None
+    for _ in range(runs):
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        subprocess.run(command, cwd=cwd, capture_output=True, check=True)
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def imported_modules(command, cwd):
+    """Return the set of modules a command imports, from `python -X importtime`"""
+    proc = subprocess.run([command[0], '-X', 'importtime'] + command[1:], cwd=cwd,
+                          capture_output=True, text=True, check=True)
+    imported = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        fields = [field.strip() for field in line[len('import time:'):].split('|')]
+        if fields[1].isdigit():  # skip the column header line
+            imported.add(fields[2])
+    return imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Smell detector startup-time benchmark')
+    parser.add_argument('--budget-ms', type=float, default=150.0,
+                        help='Allowed warm-run overhead over a bare interpreter in ms (default: 150)')
+    parser.add_argument('--runs', type=int, default=10, help='Fresh interpreters per measurement (default: 10)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work:
+        config = os.path.join(work, 'config.yaml')
+        shutil.copy(os.path.join(HERE, 'config.yaml'), config)
+        with open(os.path.join(work, 'tiny.py'), 'w') as f:
+            f.write("x = 1\n")
+        cache = os.path.join(work, '.config.yaml.cache')
+        cli = [sys.executable, os.path.join(HERE, 'smell_detector.py'), 'tiny.py',
+               '--config', config, '--output', os.path.join(work, 'report.txt')]
+
+        def drop_cache():
+            if os.path.exists(cache):
+                os.remove(cache)
+
+        baseline = best_time_ms([sys.executable, '-c', 'pass'], args.runs, work)
+        cold = best_time_ms(cli, args.runs, work, before=drop_cache)
+        # The last cold run left a fresh cache behind
+        warm = best_time_ms(cli, args.runs, work)
+        eager = sorted(m for m in DEFERRED_MODULES
+                       if m in imported_modules([sys.executable, '-c', 'import smell_detector'], HERE))
+        warm_extra = sorted(m for m in WARM_RUN_EXCLUDED if m in imported_modules(cli, work))
+
+    print(f"bare interpreter:      {baseline:6.1f} ms")
+    print(f"cold config cache run: {cold:6.1f} ms (+{cold - baseline:.1f})")
+    print(f"warm config cache run: {warm:6.1f} ms (+{warm - baseline:.1f}, budget: +{args.budget_ms:.0f})")
+    failed = False
+    if eager:
+        print(f"FAIL: importing smell_detector imported eagerly: {', '.join(eager)}")
+        failed = True
+    if warm_extra:
+        print(f"FAIL: warm run imported: {', '.join(warm_extra)}")
+        failed = True
+    if warm - baseline > args.budget_ms:
+        print("FAIL: over budget")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+Build a single-file zipapp of the detector
+Usage: python build_zipapp.py [--output smell_detector.pyz]
+The archive still needs PyYAML installed in the target interpreter.
+"""
+
+import argparse
+import shutil
+import tempfile
+import zipapp
+from pathlib import Path
+
+
+MODULES = ['smell_detector.py', 'findings_store.py', 'fingerprint_index.py', 'scheduler.py', 'metrics_store.py']
+
+
+def build(output='smell_detector.pyz', interpreter='/usr/bin/env python3'):
+    """Copy the detector modules into a staging dir and pack them as a zipapp"""
+    here = Path(__file__).resolve().parent
+    with tempfile.TemporaryDirectory() as staging:
+        for module in MODULES:
+            shutil.copy(here / module, Path(staging) / module)
+        zipapp.create_archive(staging, target=output, interpreter=interpreter,
+                              main='smell_detector:main', compressed=True)
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the smell detector zipapp')
+    parser.add_argument('--output', default='smell_detector.pyz', help='Output archive (default: smell_detector.pyz)')
+    parser.add_argument('--python', default='/usr/bin/env python3', help='Interpreter for the shebang line')
+    args = parser.parse_args()
+    print(f"Built {build(args.output, args.python)}")
+
+
+if __name__ == '__main__':
+    main()
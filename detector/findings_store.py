@@ -0,0 +1,214 @@
+"""
+Findings History Store
+Keeps every detector run in a local SQLite database so trends can be
+queried instead of diffing flat smell_report.txt files.
+"""
+
+import sqlite3
+import argparse
+from datetime import datetime
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    label TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS findings (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    smell TEXT NOT NULL,
+    key TEXT NOT NULL,
+    line INTEGER,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_findings_smell_file_run ON findings(smell, file_id, run_id);
+CREATE INDEX IF NOT EXISTS idx_findings_run_file ON findings(run_id, file_id);
+"""
+
+
+def finding_key(smell_type, smell):
+    """
+    Build a line-independent identity for a finding, so that a finding which
+    only moved within its file is not reported as new. Methods are keyed by
+    their qualified name (Class.method), so same-named methods of different
+    classes stay distinct.
+    """
+    if smell_type == 'MagicNumbers':
+        return f"{smell['context']}:{smell['value']}"
+    if smell_type == 'GodClass':
+        return smell['class']
+    if 'qualname' in smell:
+        return smell['qualname']
+    if 'method' in smell:
+        return smell['method']
+    return smell['message']
+
+
+def finding_line(smell):
+    """Return the first line number of a finding, if it has one"""
+    if 'line' in smell:
+        return smell['line']
+    if 'lines' in smell:
+        return int(str(smell['lines']).split('-')[0])
+    return None
+
+
+class FindingsStore:
+    """SQLite-backed history of detector runs and their findings"""
+
+    def __init__(self, db_path='smell_history.db'):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def record_run(self, results, label=None):
+        """
+        Store one run's results (the detector's results dict) and return the
+        new run id. All rows are written in a single transaction.
+        """
+        rows = []
+        seen = {}
+        for smell_type, smells in results.items():
+            for smell in smells:
+                path = smell.get('file', 'N/A')
+                key = finding_key(smell_type, smell)
+                # Repeats of a key in one file (e.g. a redefined method) are numbered in order
+                occurrence = seen[(path, smell_type, key)] = seen.get((path, smell_type, key), 0) + 1
+                if occurrence > 1:
+                    key = f"{key}#{occurrence}"
+                rows.append((path, smell_type, key, finding_line(smell), smell['message']))
+
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO runs (started_at, label) VALUES (?, ?)",
+                (datetime.now().isoformat(timespec='seconds'), label))
+            run_id = cursor.lastrowid
+
+            paths = {row[0] for row in rows}
+            self.conn.executemany("INSERT OR IGNORE INTO files (path) VALUES (?)",
+                                  [(p,) for p in paths])
+            file_ids = {}
+            for path in paths:
+                file_ids[path] = self.conn.execute(
+                    "SELECT id FROM files WHERE path = ?", (path,)).fetchone()[0]
+
+            self.conn.executemany(
+                "INSERT INTO findings (run_id, file_id, smell, key, line, message) VALUES (?, ?, ?, ?, ?, ?)",
+                [(run_id, file_ids[path], smell, key, line, message)
+                 for path, smell, key, line, message in rows])
+        return run_id
+
+    def latest_run(self):
+        """Return the id of the most recent run, or None"""
+        row = self.conn.execute("SELECT MAX(id) FROM runs").fetchone()
+        return row[0]
+
+    def list_runs(self, limit=20):
+        """Return (id, started_at, label, finding_count) for recent runs"""
+        return self.conn.execute("""
+            SELECT r.id, r.started_at, r.label,
+                   (SELECT COUNT(*) FROM findings f WHERE f.run_id = r.id)
+            FROM runs r ORDER BY r.id DESC LIMIT ?
+        """, (limit,)).fetchall()
+
+    def new_since(self, base_run, run_id=None):
+        """Return (path, smell, line, message) findings in run_id that were not in base_run"""
+        if run_id is None:
+            run_id = self.latest_run()
+        return self.conn.execute("""
+            SELECT fl.path, f.smell, f.line, f.message
+            FROM findings f JOIN files fl ON fl.id = f.file_id
+            WHERE f.run_id = ?
+              AND NOT EXISTS (
+                  SELECT 1 FROM findings o
+                  WHERE o.smell = f.smell AND o.file_id = f.file_id
+                    AND o.run_id = ? AND o.key = f.key)
+            ORDER BY fl.path, f.smell, f.line
+        """, (run_id, base_run)).fetchall()
+
+    def smell_counts(self, last_runs=100):
+        """Return (run_id, smell, count) rows for the last N runs"""
+        return self.conn.execute("""
+            SELECT f.run_id, f.smell, COUNT(*)
+            FROM findings f
+            WHERE f.run_id IN (SELECT id FROM runs ORDER BY id DESC LIMIT ?)
+            GROUP BY f.run_id, f.smell
+            ORDER BY f.run_id, f.smell
+        """, (last_runs,)).fetchall()
+
+    def files_getting_worse(self, base_run=None, run_id=None):
+        """
+        Return (path, before, after) for files with more findings in run_id
+        than in base_run (defaults: latest run vs the run before it). Empty
+        when there is no earlier run.
+        """
+        if run_id is None:
+            run_id = self.latest_run()
+        if base_run is None:
+            row = self.conn.execute("SELECT MAX(id) FROM runs WHERE id < ?", (run_id,)).fetchone()
+            base_run = row[0]
+        if base_run is None or run_id is None:
+            # Nothing to compare against yet
+            return []
+        return self.conn.execute("""
+            SELECT fl.path, COALESCE(b.n, 0), a.n
+            FROM (SELECT file_id, COUNT(*) AS n FROM findings WHERE run_id = ? GROUP BY file_id) a
+            JOIN files fl ON fl.id = a.file_id
+            LEFT JOIN (SELECT file_id, COUNT(*) AS n FROM findings WHERE run_id = ? GROUP BY file_id) b
+                ON b.file_id = a.file_id
+            WHERE a.n > COALESCE(b.n, 0)
+            ORDER BY a.n - COALESCE(b.n, 0) DESC, fl.path
+        """, (run_id, base_run)).fetchall()
+
+
+def main():
+    """Query the findings history from the command line"""
+    parser = argparse.ArgumentParser(description='Query code smell findings history')
+    parser.add_argument('--db', default='smell_history.db', help='History database (default: smell_history.db)')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    runs = sub.add_parser('runs', help='List recent runs')
+    runs.add_argument('--limit', type=int, default=20)
+
+    new = sub.add_parser('new-since', help='Findings that are new since a run')
+    new.add_argument('base_run', type=int)
+    new.add_argument('--run', type=int, help='Run to compare (default: latest)')
+
+    counts = sub.add_parser('counts', help='Per-smell counts over the last N runs')
+    counts.add_argument('--last', type=int, default=100)
+
+    worse = sub.add_parser('worse', help='Files with more findings than in an earlier run')
+    worse.add_argument('--base', type=int, help='Base run (default: the run before --run)')
+    worse.add_argument('--run', type=int, help='Run to compare (default: latest)')
+
+    args = parser.parse_args()
+    store = FindingsStore(args.db)
+
+    if args.command == 'runs':
+        for run_id, started_at, label, count in store.list_runs(args.limit):
+            print(f"{run_id:>6}  {started_at}  {count:>6} finding(s)  {label or ''}")
+    elif args.command == 'new-since':
+        for path, smell, line, message in store.new_since(args.base_run, args.run):
+            print(f"{path}:{line or ''}  [{smell}] {message}")
+    elif args.command == 'counts':
+        for run_id, smell, count in store.smell_counts(args.last):
+            print(f"{run_id:>6}  {smell:<20} {count}")
+    elif args.command == 'worse':
+        for path, before, after in store.files_getting_worse(args.base, args.run):
+            print(f"{path}: {before} -> {after}")
+
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
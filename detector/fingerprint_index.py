@@ -0,0 +1,199 @@
+"""
+Reference Corpus Fingerprint Index
+Stores the DuplicatedCode window fingerprints of a reference corpus
+(vendored libraries, old forks, ...) in a sorted on-disk file that analysis
+runs memory-map and binary-search, instead of re-analyzing the corpus.
+
+File layout (little endian):
+    header    magic, window, source_count, entry_count, entries_offset, sources_offset
+    entries   entry_count x (fingerprint u64, source_id u32, line u32), sorted by fingerprint
+    sources   (source_count + 1) x u64 offsets into the path blob, then the UTF-8 path blob
+"""
+
+import os
+import mmap
+import heapq
+import struct
+import argparse
+import tempfile
+from pathlib import Path
+
+from smell_detector import window_fingerprints, is_archive, iter_archive_sources
+
+
+MAGIC = b'SMFPIDX1'
+HEADER = struct.Struct('<8sIIQQQ')
+ENTRY = struct.Struct('<QII')
+OFFSET = struct.Struct('<Q')
+FINGERPRINT = struct.Struct('<Q')
+# Entries held in memory before a sorted run is written to disk
+DEFAULT_RUN_SIZE = 500000
+
+
+def iter_corpus_sources(paths):
+    """Yield (display_path, source_code) for .py files under paths, including archives"""
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            files = sorted(path.rglob('*.py'))
+        else:
+            files = [path]
+        for file in files:
+            if is_archive(file):
+                for member_path, data in iter_archive_sources(file):
+                    yield member_path, data.decode('utf-8', errors='replace')
+            else:
+                yield str(file), file.read_text(encoding='utf-8', errors='replace')
+
+
+def write_run(entries, directory):
+    """Sort (fingerprint, source_id, line) entries and write them to a new run file; returns its path"""
+    entries.sort()
+    fd, path = tempfile.mkstemp(suffix='.run', dir=directory)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(b''.join(ENTRY.pack(*entry) for entry in entries))
+    return path
+
+
+def iter_run(path, chunk_entries=65536):
+    """Yield the (fingerprint, source_id, line) entries of a run file in order"""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_entries * ENTRY.size)
+            if not chunk:
+                break
+            yield from ENTRY.iter_unpack(chunk)
+
+
+def build_index(output_file, paths, window=5, run_size=DEFAULT_RUN_SIZE):
+    """
+    Fingerprint every Python file under paths and write a sorted index file.
+    Only the first occurrence (in corpus order) of each fingerprint is kept.
+    Memory is bounded by run_size: fingerprints are sorted in runs of that
+    many entries, spilled to temporary files, then merged into the index.
+    Returns the number of entries written.
+    """
+    output_file = str(output_file)
+    directory = os.path.dirname(os.path.abspath(output_file))
+    sources = []
+    runs = []
+    try:
+        entries = []
+        for display_path, source_code in iter_corpus_sources(paths):
+            source_id = len(sources)
+            sources.append(display_path)
+            for fingerprint, start_line, _ in window_fingerprints(source_code.split('\n'), window):
+                entries.append((fingerprint, source_id, start_line))
+                if len(entries) >= run_size:
+                    runs.append(write_run(entries, directory))
+                    entries = []
+        if entries:
+            runs.append(write_run(entries, directory))
+        del entries
+
+        blob = bytearray()
+        offsets = []
+        for display_path in sources:
+            offsets.append(len(blob))
+            blob += display_path.encode('utf-8')
+        offsets.append(len(blob))
+
+        entries_offset = HEADER.size
+        count = 0
+        with open(output_file, 'wb') as f:
+            # Entry count and sources offset are only known after the merge
+            f.write(HEADER.pack(MAGIC, window, len(sources), 0, entries_offset, 0))
+            previous = None
+            for fingerprint, source_id, line in heapq.merge(*(iter_run(path) for path in runs)):
+                if fingerprint != previous:
+                    f.write(ENTRY.pack(fingerprint, source_id, line))
+                    previous = fingerprint
+                    count += 1
+            sources_offset = entries_offset + count * ENTRY.size
+            for offset in offsets:
+                f.write(OFFSET.pack(offset))
+            f.write(blob)
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, window, len(sources), count, entries_offset, sources_offset))
+    finally:
+        for path in runs:
+            os.remove(path)
+    return count
+
+
+class FingerprintIndex:
+    """
+    Read-only, memory-mapped view of an index file. Opening only reads the
+    header, so startup cost does not depend on index size, and the mapping
+    is shared through the page cache by every process that opens it.
+    """
+
+    def __init__(self, index_file):
+        self.index_file = index_file
+        with open(index_file, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.window, self.source_count, self.entry_count, \
+            self.entries_offset, self.sources_offset = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            self.mm.close()
+            raise ValueError(f"{index_file} is not a fingerprint index")
+        self.blob_offset = self.sources_offset + (self.source_count + 1) * OFFSET.size
+
+    def close(self):
+        self.mm.close()
+
+    def __len__(self):
+        return self.entry_count
+
+    def lookup(self, fingerprint):
+        """Binary-search for a fingerprint; return (source_id, line) or None"""
+        lo, hi = 0, self.entry_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = FINGERPRINT.unpack_from(self.mm, self.entries_offset + mid * ENTRY.size)[0]
+            if value < fingerprint:
+                lo = mid + 1
+            elif value > fingerprint:
+                hi = mid
+            else:
+                _, source_id, line = ENTRY.unpack_from(self.mm, self.entries_offset + mid * ENTRY.size)
+                return source_id, line
+        return None
+
+    def source_path(self, source_id):
+        """Return the corpus path recorded for a source id"""
+        start, end = struct.unpack_from('<QQ', self.mm, self.sources_offset + source_id * OFFSET.size)
+        return self.mm[self.blob_offset + start:self.blob_offset + end].decode('utf-8')
+
+
+def main():
+    """Build or inspect a fingerprint index from the command line"""
+    parser = argparse.ArgumentParser(description='Reference corpus fingerprint index')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help='Build an index from files, directories and archives')
+    build.add_argument('index', help='Index file to write')
+    build.add_argument('paths', nargs='+', help='Reference corpus paths')
+    build.add_argument('--window', type=int, default=5,
+                       help='Lines per fingerprint window; match DuplicatedCode min_lines (default: 5)')
+    build.add_argument('--run-size', type=int, default=DEFAULT_RUN_SIZE,
+                       help=f'Fingerprints sorted in memory per run; bounds memory use (default: {DEFAULT_RUN_SIZE})')
+
+    info = sub.add_parser('info', help='Show index statistics')
+    info.add_argument('index', help='Index file to read')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        count = build_index(args.index, args.paths, args.window, args.run_size)
+        print(f"Wrote {count} fingerprint(s) to {args.index}")
+    elif args.command == 'info':
+        index = FingerprintIndex(args.index)
+        print(f"Window: {index.window} lines")
+        print(f"Sources: {index.source_count}")
+        print(f"Fingerprints: {index.entry_count}")
+        index.close()
+
+
+if __name__ == '__main__':
+    main()
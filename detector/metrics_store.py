@@ -0,0 +1,254 @@
+"""
+Raw Metrics Store and Threshold Explorer
+First phase: record the raw per-function and per-class metrics the detectors
+compare against their thresholds, in compact typed columns.
+Second phase: evaluate any threshold set against those columns without
+re-parsing, e.g. to sweep a grid of config.yaml values in seconds.
+DuplicatedCode is not covered; its similarity check needs the source lines.
+"""
+
+import ast
+import marshal
+import argparse
+from array import array
+from bisect import bisect_right
+from collections import Counter
+
+from smell_detector import (
+    CodeSmellDetector, is_archive, iter_archive_sources, function_span, parameter_count,
+    class_member_counts, is_envy_candidate, attribute_access_counts, external_access_ratio,
+    is_numeric_literal
+)
+
+
+# Column name -> array typecode
+FUNCTION_COLUMNS = {'file': 'I', 'line': 'I', 'length': 'I', 'params': 'I',
+                    'envy': 'b', 'self_accesses': 'I', 'external_accesses': 'I'}
+CLASS_COLUMNS = {'file': 'I', 'line': 'I', 'methods': 'I', 'attributes': 'I'}
+STORE_VERSION = 1
+
+
+def count_above(sorted_values, threshold):
+    """Count values strictly greater than threshold in a sorted sequence"""
+    return len(sorted_values) - bisect_right(sorted_values, threshold)
+
+
+class MetricsStore:
+    """Columnar store of raw detector metrics for many files"""
+
+    def __init__(self):
+        self.files = []
+        self.functions = {name: array(code) for name, code in FUNCTION_COLUMNS.items()}
+        self.function_names = []
+        self.classes = {name: array(code) for name, code in CLASS_COLUMNS.items()}
+        self.class_names = []
+        # Numeric literals are dictionary-encoded: value -> occurrence count
+        self.literals = Counter()
+        self._sorted = None
+
+    def add_source(self, source_code, filepath):
+        """Record the metrics of one source file; returns False on syntax errors"""
+        try:
+            tree = ast.parse(source_code)
+        except SyntaxError as e:
+            print(f"Syntax error in {filepath}: {e}")
+            return False
+
+        file_id = len(self.files)
+        self.files.append(filepath)
+        self._sorted = None
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                self_accesses, external_accesses = attribute_access_counts(node)
+                columns = self.functions
+                columns['file'].append(file_id)
+                columns['line'].append(node.lineno)
+                columns['length'].append(function_span(node)[2])
+                columns['params'].append(parameter_count(node))
+                columns['envy'].append(1 if is_envy_candidate(node) else 0)
+                columns['self_accesses'].append(self_accesses)
+                columns['external_accesses'].append(external_accesses)
+                self.function_names.append(node.name)
+            elif isinstance(node, ast.ClassDef):
+                method_count, attributes = class_member_counts(node)
+                columns = self.classes
+                columns['file'].append(file_id)
+                columns['line'].append(node.lineno)
+                columns['methods'].append(method_count)
+                columns['attributes'].append(attributes)
+                self.class_names.append(node.name)
+            elif is_numeric_literal(node):
+                self.literals[node.value] += 1
+        return True
+
+    def add_file(self, filepath):
+        """Record a .py file, or every .py member of a wheel/zip/sdist archive"""
+        if is_archive(filepath):
+            for member_path, data in iter_archive_sources(filepath):
+                self.add_source(data.decode('utf-8', errors='replace'), member_path)
+        else:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                self.add_source(f.read(), filepath)
+
+    def save(self, path):
+        """Write the store as marshalled column bytes"""
+        data = {
+            'version': STORE_VERSION,
+            'files': self.files,
+            'functions': {name: column.tobytes() for name, column in self.functions.items()},
+            'function_names': self.function_names,
+            'classes': {name: column.tobytes() for name, column in self.classes.items()},
+            'class_names': self.class_names,
+            'literals': dict(self.literals)
+        }
+        with open(path, 'wb') as f:
+            marshal.dump(data, f)
+
+    @classmethod
+    def load(cls, path):
+        """Read a store written by save()"""
+        with open(path, 'rb') as f:
+            data = marshal.load(f)
+        if data.get('version') != STORE_VERSION:
+            raise ValueError(f"{path}: unsupported metrics store version")
+        store = cls()
+        store.files = data['files']
+        for name, code in FUNCTION_COLUMNS.items():
+            store.functions[name] = array(code, data['functions'][name])
+        store.function_names = data['function_names']
+        for name, code in CLASS_COLUMNS.items():
+            store.classes[name] = array(code, data['classes'][name])
+        store.class_names = data['class_names']
+        store.literals = Counter(data['literals'])
+        return store
+
+    def sorted_columns(self):
+        """Sorted views of the single-threshold metrics, built once per store"""
+        if self._sorted is None:
+            ratios = []
+            columns = self.functions
+            for envy, self_accesses, external_accesses in zip(
+                    columns['envy'], columns['self_accesses'], columns['external_accesses']):
+                if envy:
+                    ratio = external_access_ratio(self_accesses, external_accesses)
+                    if ratio is not None:
+                        ratios.append(ratio)
+            self._sorted = {
+                'length': sorted(columns['length']),
+                'params': sorted(columns['params']),
+                'envy_ratio': sorted(ratios)
+            }
+        return self._sorted
+
+    def count_long_methods(self, max_lines):
+        return count_above(self.sorted_columns()['length'], max_lines)
+
+    def count_large_parameter_lists(self, max_parameters):
+        return count_above(self.sorted_columns()['params'], max_parameters)
+
+    def count_feature_envy(self, external_call_threshold):
+        return count_above(self.sorted_columns()['envy_ratio'], external_call_threshold)
+
+    def count_god_classes(self, max_methods, max_attributes):
+        return sum(1 for methods, attributes in zip(self.classes['methods'], self.classes['attributes'])
+                   if methods > max_methods or attributes > max_attributes)
+
+    def count_magic_numbers(self, allowed_numbers):
+        return sum(count for value, count in self.literals.items() if value not in allowed_numbers)
+
+    def evaluate(self, smells_config):
+        """Return smell -> finding count for a config 'smells' section"""
+        counts = {}
+        if 'LongMethod' in smells_config:
+            counts['LongMethod'] = self.count_long_methods(smells_config['LongMethod']['max_lines'])
+        if 'GodClass' in smells_config:
+            settings = smells_config['GodClass']
+            counts['GodClass'] = self.count_god_classes(settings['max_methods'], settings['max_attributes'])
+        if 'LargeParameterList' in smells_config:
+            counts['LargeParameterList'] = self.count_large_parameter_lists(
+                smells_config['LargeParameterList']['max_parameters'])
+        if 'MagicNumbers' in smells_config:
+            counts['MagicNumbers'] = self.count_magic_numbers(smells_config['MagicNumbers']['allowed_numbers'])
+        if 'FeatureEnvy' in smells_config:
+            counts['FeatureEnvy'] = self.count_feature_envy(
+                smells_config['FeatureEnvy']['external_call_threshold'])
+        return counts
+
+
+def parse_values(text, convert=int):
+    """Parse a comma-separated list of sweep values"""
+    return [convert(value) for value in text.split(',') if value.strip()]
+
+
+def print_sweep(store, args):
+    """Print finding counts for every requested threshold value"""
+    if args.max_lines:
+        print("LongMethod (max_lines)")
+        for value in parse_values(args.max_lines):
+            print(f"  {value:>8}: {store.count_long_methods(value)}")
+    if args.max_parameters:
+        print("LargeParameterList (max_parameters)")
+        for value in parse_values(args.max_parameters):
+            print(f"  {value:>8}: {store.count_large_parameter_lists(value)}")
+    if args.external_call_threshold:
+        print("FeatureEnvy (external_call_threshold)")
+        for value in parse_values(args.external_call_threshold, float):
+            print(f"  {value:>8}: {store.count_feature_envy(value)}")
+    if args.max_methods or args.max_attributes:
+        max_methods = parse_values(args.max_methods or '15')
+        max_attributes = parse_values(args.max_attributes or '10')
+        print("GodClass (rows: max_methods, columns: max_attributes)")
+        print("  " + " " * 8 + "".join(f"{value:>8}" for value in max_attributes))
+        for methods in max_methods:
+            row = "".join(f"{store.count_god_classes(methods, attributes):>8}" for attributes in max_attributes)
+            print(f"  {methods:>8}{row}")
+    if args.allowed_numbers:
+        print("MagicNumbers (allowed_numbers)")
+        for allowed in args.allowed_numbers.split(';'):
+            values = parse_values(allowed, float)
+            print(f"  [{allowed}]: {store.count_magic_numbers(values)}")
+
+
+def main():
+    """Collect metrics, evaluate a config or sweep thresholds from the command line"""
+    parser = argparse.ArgumentParser(description='Raw metrics store and threshold explorer')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    collect = sub.add_parser('collect', help='Analyze files once and write the metrics store')
+    collect.add_argument('store', help='Metrics store file to write')
+    collect.add_argument('files', nargs='+', help='Python files or .whl/.zip/.tar.gz archives')
+
+    evaluate = sub.add_parser('evaluate', help='Finding counts for a config file')
+    evaluate.add_argument('store', help='Metrics store file')
+    evaluate.add_argument('--config', default='config.yaml', help='Configuration file (default: config.yaml)')
+
+    sweep = sub.add_parser('sweep', help='Finding counts across a grid of thresholds')
+    sweep.add_argument('store', help='Metrics store file')
+    sweep.add_argument('--max-lines', help='LongMethod values, e.g. 30,40,50')
+    sweep.add_argument('--max-parameters', help='LargeParameterList values, e.g. 3,4,5')
+    sweep.add_argument('--max-methods', help='GodClass method values, e.g. 10,15,20')
+    sweep.add_argument('--max-attributes', help='GodClass attribute values, e.g. 7,10,15')
+    sweep.add_argument('--external-call-threshold', help='FeatureEnvy values, e.g. 0.5,0.6,0.7')
+    sweep.add_argument('--allowed-numbers', help='MagicNumbers sets separated by ";", e.g. "0,1,-1;0,1,-1,2"')
+
+    args = parser.parse_args()
+
+    if args.command == 'collect':
+        store = MetricsStore()
+        for filepath in args.files:
+            store.add_file(filepath)
+        store.save(args.store)
+        print(f"Recorded {len(store.function_names)} function(s) and {len(store.class_names)} class(es) "
+              f"from {len(store.files)} file(s) in {args.store}")
+    elif args.command == 'evaluate':
+        store = MetricsStore.load(args.store)
+        smells = CodeSmellDetector(args.config).config['smells']
+        enabled = {smell: settings for smell, settings in smells.items() if settings['enabled']}
+        for smell, count in store.evaluate(enabled).items():
+            print(f"{smell:<20} {count}")
+    elif args.command == 'sweep':
+        print_sweep(MetricsStore.load(args.store), args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Cost-Model Work Scheduler
+Runs multi-file analysis on a process pool, dispatching the most expensive
+files first so a giant file never starts last while the other workers idle.
+Per-file costs are estimated from file size and from the timings recorded on
+earlier runs, which are persisted in a JSON file next to the config.
+Outlier files are split into one task per active smell.
+"""
+
+import os
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from smell_detector import CodeSmellDetector, is_archive
+
+
+# Seconds per byte assumed before any timings have been recorded
+DEFAULT_SECONDS_PER_BYTE = 2e-6
+
+
+def get_timings_path(config_file):
+    """Return the timings file path for a config file (.<name>.timings.json beside it)"""
+    directory, name = os.path.split(config_file)
+    return os.path.join(directory, f".{name}.timings.json")
+
+
+class CostModel:
+    """Estimates per-file analysis cost from size and recorded timings"""
+
+    def __init__(self, timings_file):
+        self.timings_file = timings_file
+        try:
+            with open(timings_file, 'r') as f:
+                self.timings = json.load(f)
+        except (OSError, ValueError):
+            self.timings = {}
+
+    def seconds_per_byte(self):
+        """Median observed analysis rate, or the default before any runs"""
+        rates = sorted(t['seconds'] / t['size'] for t in self.timings.values() if t['size'] > 0)
+        if not rates:
+            return DEFAULT_SECONDS_PER_BYTE
+        return rates[len(rates) // 2]
+
+    def estimate(self, filepath, size):
+        """Estimate the seconds needed to analyze a file of the given size"""
+        recorded = self.timings.get(os.path.abspath(filepath))
+        if recorded and recorded['size'] > 0:
+            return recorded['seconds'] * size / recorded['size']
+        return size * self.seconds_per_byte()
+
+    def record(self, filepath, size, seconds):
+        self.timings[os.path.abspath(filepath)] = {'size': size, 'seconds': seconds}
+
+    def save(self):
+        try:
+            with open(self.timings_file, 'w') as f:
+                json.dump(self.timings, f)
+        except OSError:
+            pass
+
+
+def plan_tasks(files, active_smells, cost_model, jobs):
+    """
+    Return (filepath, smells, estimated_cost) tasks in longest-first order.
+    A file estimated to cost more than an even share of the total is split
+    into one task per smell so its detectors run on several workers.
+    """
+    estimates = []
+    for filepath in files:
+        size = os.path.getsize(filepath)
+        estimates.append((filepath, cost_model.estimate(filepath, size)))
+
+    share = sum(cost for _, cost in estimates) / max(jobs, 1)
+    tasks = []
+    for filepath, cost in estimates:
+        if jobs > 1 and cost > share and len(active_smells) > 1:
+            # Without per-smell timings, split the estimate evenly
+            for smell in active_smells:
+                tasks.append((filepath, [smell], cost / len(active_smells)))
+        else:
+            tasks.append((filepath, list(active_smells), cost))
+    tasks.sort(key=lambda task: task[2], reverse=True)
+    return tasks
+
+
+_worker_detector = None
+
+
+def _init_worker(config_file, reference_index):
+    global _worker_detector
+    _worker_detector = CodeSmellDetector(config_file)
+    if reference_index:
+        from fingerprint_index import FingerprintIndex
+        _worker_detector.reference_index = FingerprintIndex(reference_index)
+
+
+def _run_task(filepath, smells):
+    """Analyze one file for a subset of smells in a worker process"""
+    detector = _worker_detector
+    detector.active_smells = smells
+    detector.results = {smell: [] for smell in detector.results}
+    started = time.perf_counter()
+    if is_archive(filepath):
+        detector.analyze_archive(filepath)
+    else:
+        detector.analyze_file(filepath)
+    return detector.results, time.perf_counter() - started
+
+
+def analyze_parallel(detector, files, jobs, config_file='config.yaml', reference_index=None,
+                     longest_first=True):
+    """
+    Analyze files on `jobs` worker processes and merge the findings into
+    detector.results in the original file order. A path given more than once
+    is analyzed once. Returns the wall time.
+    """
+    files = list(dict.fromkeys(files))
+    cost_model = CostModel(get_timings_path(config_file))
+    tasks = plan_tasks(files, detector.active_smells, cost_model, jobs)
+    if not longest_first:
+        order = {filepath: i for i, filepath in enumerate(files)}
+        tasks.sort(key=lambda task: order[task[0]])
+
+    started = time.perf_counter()
+    partial = {filepath: [] for filepath in files}
+    elapsed = {filepath: 0.0 for filepath in files}
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(config_file, reference_index)) as pool:
+        futures = {pool.submit(_run_task, filepath, smells): filepath
+                   for filepath, smells, _ in tasks}
+        for future in as_completed(futures):
+            filepath = futures[future]
+            results, seconds = future.result()
+            partial[filepath].append(results)
+            elapsed[filepath] += seconds
+    wall_time = time.perf_counter() - started
+
+    for filepath in files:
+        for smell in detector.active_smells:
+            for results in partial[filepath]:
+                detector.results[smell].extend(results[smell])
+        cost_model.record(filepath, os.path.getsize(filepath), elapsed[filepath])
+    cost_model.save()
+    return wall_time
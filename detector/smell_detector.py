@@ -5,11 +5,291 @@ Detects 6 common code smells in Python source code
 """
 
 import ast
-import re
-import yaml
-import argparse
-from collections import defaultdict
-from pathlib import Path
+import os
+import marshal
+
+# yaml, argparse, hashlib and the archive modules are imported where they are
+# used: the small invocations made by editor hooks should not pay for them.
+
+# Bump when the cached config layout changes
+CONFIG_CACHE_VERSION = 1
+
+
+# Archive formats that can be analyzed in place, without extracting to disk
+ZIP_SUFFIXES = ('.whl', '.zip')
+TAR_SUFFIXES = ('.tar.gz', '.tgz')
+
+
+def is_archive(filepath):
+    """Check whether a path names a supported wheel/zip/sdist archive"""
+    return str(filepath).lower().endswith(ZIP_SUFFIXES + TAR_SUFFIXES)
+
+
+def iter_archive_sources(archive_path):
+    """
+    Yield (display_path, source_code) for every .py member of an archive.
+    Members are read straight from the archive stream, so no temporary
+    files are created. Display paths use the 'archive!/inner/path.py' form.
+    """
+    archive_path = str(archive_path)
+    if archive_path.lower().endswith(ZIP_SUFFIXES):
+        import zipfile
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not info.filename.endswith('.py'):
+                    continue
+                with archive.open(info) as member:
+                    yield f"{archive_path}!/{info.filename}", member.read()
+    else:
+        import tarfile
+        # 'r|gz' reads the tarball sequentially, never seeking backwards
+        with tarfile.open(archive_path, 'r|gz') as archive:
+            for info in archive:
+                if not info.isfile() or not info.name.endswith('.py'):
+                    continue
+                member = archive.extractfile(info)
+                yield f"{archive_path}!/{info.name}", member.read()
+
+
+def normalize_source_lines(source_lines):
+    """
+    Normalize lines for duplicate detection (strip whitespace, drop blank and
+    comment lines). Returns (normalized_lines, original_line_numbers).
+    """
+    normalized_lines = []
+    line_numbers = []
+    for number, line in enumerate(source_lines, 1):
+        stripped = line.strip()
+        if stripped and not stripped.startswith('#'):
+            normalized_lines.append(stripped)
+            line_numbers.append(number)
+    return normalized_lines, line_numbers
+
+
+def window_fingerprints(source_lines, window):
+    """
+    Yield (fingerprint, start_line, end_line) for every window of `window`
+    consecutive normalized lines. Fingerprints are unsigned 64-bit ints.
+    """
+    import hashlib
+    normalized_lines, line_numbers = normalize_source_lines(source_lines)
+    for i in range(len(normalized_lines) - window + 1):
+        block = '\n'.join(normalized_lines[i:i + window]).encode('utf-8')
+        digest = hashlib.blake2b(block, digest_size=8).digest()
+        yield int.from_bytes(digest, 'big'), line_numbers[i], line_numbers[i + window - 1]
+
+
+def block_similarity(lines, i, j, window):
+    """Fraction of equal lines between the windows starting at i and j"""
+    return sum(1 for a, b in zip(lines[i:i + window], lines[j:j + window]) if a == b) / window
+
+
+def first_duplicate(lines, i, candidates, window, min_similarity):
+    """Return the first window in candidates similar enough to window i, or -1"""
+    block = lines[i:i + window]
+    for j in candidates:
+        if sum(1 for a, b in zip(block, lines[j:j + window]) if a == b) / window >= min_similarity:
+            return j
+    return -1
+
+
+def duplicate_matches(lines, window, min_similarity):
+    """
+    For every window i of normalized lines, the first later non-overlapping
+    window j similar enough to it, or -1. This is the O(n^2) DuplicatedCode scan.
+    """
+    bound = len(lines) - window
+    return [first_duplicate(lines, i, range(i + window, bound), window, min_similarity)
+            for i in range(max(bound, 0))]
+
+
+def update_duplicate_matches(old_lines, old_matches, lines, window, min_similarity):
+    """
+    duplicate_matches(lines, ...) computed from the result for old_lines.
+    Lines outside the edited region (common prefix and suffix) are unchanged,
+    so a window there keeps its old match unless an edited window now comes
+    first; only windows overlapping the edit are compared with everything.
+    Cost is about (edited windows) x (all windows) instead of all x all.
+    """
+    from bisect import bisect_left
+    old_count, count = len(old_lines), len(lines)
+    limit = min(old_count, count)
+    prefix = 0
+    while prefix < limit and old_lines[prefix] == lines[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old_lines[old_count - 1 - suffix] == lines[count - 1 - suffix]:
+        suffix += 1
+    delta = count - old_count
+    old_bound = old_count - window
+    bound = count - window
+    
+    def new_index(old):
+        """Position of an unchanged old window in the new lines, or None if it was edited"""
+        if old + window <= prefix:
+            return old
+        if old >= old_count - suffix:
+            return old + delta
+        return None
+    
+    # Old index of each new window whose lines and old result are reusable
+    clean = [None] * max(bound, 0)
+    for old in range(max(old_bound, 0)):
+        new = new_index(old)
+        if new is not None and 0 <= new < bound:
+            clean[new] = old
+    dirty = [i for i, old in enumerate(clean) if old is None]
+    
+    matches = []
+    for i, old in enumerate(clean):
+        if old is None:
+            matches.append(first_duplicate(lines, i, range(i + window, bound), window, min_similarity))
+            continue
+        candidate = bound
+        if old_matches[old] >= 0:
+            candidate = new_index(old_matches[old])
+            if candidate is None or candidate >= bound or clean[candidate] is None:
+                # The old match was edited away: search everything after i again
+                matches.append(first_duplicate(lines, i, range(i + window, bound), window, min_similarity))
+                continue
+        # Unchanged windows before the old match still do not match; edited ones might
+        start = bisect_left(dirty, i + window)
+        stop = bisect_left(dirty, candidate)
+        match = first_duplicate(lines, i, dirty[start:stop], window, min_similarity)
+        matches.append(candidate if match < 0 and candidate < bound else match)
+    return matches
+
+
+# Raw metrics (first phase). Each detector measures a node with one of these
+# helpers and then compares the measurement with its configured threshold, so
+# metrics_store.py can record the same numbers once and re-evaluate any
+# threshold set without re-parsing.
+
+def function_span(node):
+    """Return (start_line, end_line, length) of a function definition"""
+    start_line = node.lineno
+    end_line = node.end_lineno if hasattr(node, 'end_lineno') else start_line
+    return start_line, end_line, end_line - start_line + 1
+
+
+def parameter_count(node):
+    """Count positional parameters, not counting a leading 'self' or 'cls'"""
+    param_count = len(node.args.args)
+    if param_count > 0 and node.args.args[0].arg in ['self', 'cls']:
+        param_count -= 1
+    return param_count
+
+
+def class_member_counts(node):
+    """Return (method_count, attribute_count) for a class definition"""
+    methods = [n for n in node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    
+    # Count attributes initialized in __init__
+    attributes = 0
+    for item in node.body:
+        if isinstance(item, ast.FunctionDef) and item.name == '__init__':
+            for stmt in ast.walk(item):
+                if isinstance(stmt, ast.Assign):
+                    for target in stmt.targets:
+                        if isinstance(target, ast.Attribute):
+                            if isinstance(target.value, ast.Name) and target.value.id == 'self':
+                                attributes += 1
+    return len(methods), attributes
+
+
+def is_envy_candidate(node):
+    """Feature envy is only checked for plain methods taking 'self'"""
+    return isinstance(node, ast.FunctionDef) and bool(node.args.args) and node.args.args[0].arg == 'self'
+
+
+def attribute_access_counts(node):
+    """Return (self_accesses, external_accesses) of name.attribute reads in a function"""
+    self_accesses = 0
+    external_accesses = 0
+    for child in ast.walk(node):
+        if isinstance(child, ast.Attribute):
+            if isinstance(child.value, ast.Name):
+                if child.value.id == 'self':
+                    self_accesses += 1
+                else:
+                    external_accesses += 1
+    return self_accesses, external_accesses
+
+
+def external_access_ratio(self_accesses, external_accesses):
+    """Return the external access ratio, or None when the method qualifies for no check"""
+    total_accesses = self_accesses + external_accesses
+    if total_accesses == 0 or external_accesses <= 3:
+        return None
+    return external_accesses / total_accesses
+
+
+def qualified_names(tree):
+    """Map every function/class node under tree to its dotted name, e.g. 'Library.add_book'"""
+    names = {}
+    
+    def visit(node, prefix):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                names[child] = prefix + child.name
+                visit(child, names[child] + '.')
+            else:
+                visit(child, prefix)
+    
+    if isinstance(tree, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        names[tree] = tree.name
+        visit(tree, tree.name + '.')
+    else:
+        visit(tree, '')
+    return names
+
+
+def is_numeric_literal(node):
+    """Check whether a node is a numeric constant (bool, int, float or complex)"""
+    return isinstance(node, ast.Constant) and isinstance(node.value, (int, float, complex))
+
+
+# Detectors that only look inside one function/class, so an incremental
+# analysis can re-run them on the changed top-level units alone
+UNIT_SMELLS = ('LongMethod', 'GodClass', 'LargeParameterList', 'MagicNumbers', 'FeatureEnvy')
+
+
+def shift_finding(smell_type, finding, delta):
+    """Return a copy of a unit finding moved down by delta lines"""
+    shifted = dict(finding)
+    if 'line' in shifted:
+        shifted['line'] += delta
+    if 'lines' in shifted:
+        start, end = str(shifted['lines']).split('-')
+        shifted['lines'] = f"{int(start) + delta}-{int(end) + delta}"
+    if smell_type == 'MagicNumbers':
+        shifted['message'] = f"Magic number {shifted['value']} found at line {shifted['line']} in {shifted['context']}"
+    return shifted
+
+
+class AnalysisState:
+    """
+    Per-file state kept between incremental analyses: the source text, its
+    top-level units (span, content hash and findings of each function, class
+    or statement), the whole-file DuplicatedCode findings and the duplicate
+    scan they came from (settings, normalized lines, match per window).
+    """
+    
+    def __init__(self, filepath, source_code, units, file_findings, changed_units=0, duplicate_scan=None):
+        self.filepath = filepath
+        self.source_code = source_code
+        self.units = units
+        self.file_findings = file_findings
+        self.changed_units = changed_units
+        self.duplicate_scan = duplicate_scan
+    
+    def findings(self):
+        """Return all findings for the file as a smell -> list dict, in unit order"""
+        merged = {smell: list(items) for smell, items in self.file_findings.items()}
+        for unit in self.units:
+            for smell, items in unit['findings'].items():
+                merged.setdefault(smell, []).extend(items)
+        return merged
 
 
 class CodeSmellDetector:
@@ -26,15 +306,62 @@ class CodeSmellDetector:
             'FeatureEnvy': []
         }
         self.active_smells = []
+        self.reference_index = None
     
     def load_config(self, config_file):
-        """Load configuration from YAML file"""
+        """
+        Load configuration from YAML file. The parsed, validated config is
+        cached in marshal form next to the YAML file, keyed by its mtime and
+        content hash, so repeat runs skip importing yaml and parsing.
+        """
         try:
-            with open(config_file, 'r') as f:
-                return yaml.safe_load(f)
+            with open(config_file, 'rb') as f:
+                raw = f.read()
+                mtime = os.fstat(f.fileno()).st_mtime_ns
         except FileNotFoundError:
             print(f"Warning: {config_file} not found. Using default configuration.")
             return self.get_default_config()
+        
+        import hashlib
+        digest = hashlib.sha256(raw).hexdigest()
+        cache_file = self.get_config_cache_path(config_file)
+        try:
+            with open(cache_file, 'rb') as f:
+                version, cached_mtime, cached_digest, config = marshal.load(f)
+            if (version, cached_mtime, cached_digest) == (CONFIG_CACHE_VERSION, mtime, digest):
+                return config
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+        
+        import yaml
+        config = self.validate_config(yaml.safe_load(raw), config_file)
+        try:
+            with open(cache_file, 'wb') as f:
+                marshal.dump((CONFIG_CACHE_VERSION, mtime, digest, config), f)
+        except (OSError, ValueError):
+            # Read-only checkout or a value marshal cannot store: just skip caching
+            pass
+        return config
+    
+    def get_config_cache_path(self, config_file):
+        """Return the cache file path for a config file (.<name>.cache beside it)"""
+        directory, name = os.path.split(config_file)
+        return os.path.join(directory, f".{name}.cache")
+    
+    def validate_config(self, config, config_file='config.yaml'):
+        """Check the config structure and fill missing thresholds from defaults"""
+        if not isinstance(config, dict) or not isinstance(config.get('smells'), dict):
+            raise ValueError(f"{config_file}: expected a 'smells' mapping")
+        
+        defaults = self.get_default_config()['smells']
+        for smell, settings in config['smells'].items():
+            if smell not in defaults:
+                raise ValueError(f"{config_file}: unknown smell '{smell}'")
+            if not isinstance(settings, dict):
+                raise ValueError(f"{config_file}: settings for '{smell}' must be a mapping")
+            for key, value in defaults[smell].items():
+                settings.setdefault(key, value)
+        return config
     
     def get_default_config(self):
         """Return default configuration"""
@@ -68,6 +395,23 @@ class CodeSmellDetector:
         with open(filepath, 'r', encoding='utf-8') as f:
             source_code = f.read()
         
+        self.analyze_source(source_code, filepath)
+    
+    def analyze_archive(self, archive_path):
+        """Analyze every Python file inside a wheel, zip or sdist archive"""
+        analyzed = 0
+        for member_path, data in iter_archive_sources(archive_path):
+            try:
+                source_code = data.decode('utf-8')
+            except UnicodeDecodeError as e:
+                print(f"Encoding error in {member_path}: {e}")
+                continue
+            self.analyze_source(source_code, member_path)
+            analyzed += 1
+        return analyzed
+    
+    def analyze_source(self, source_code, filepath):
+        """Analyze Python source text; filepath is only used for reporting"""
         try:
             tree = ast.parse(source_code)
         except SyntaxError as e:
@@ -84,6 +428,8 @@ class CodeSmellDetector:
         
         if 'DuplicatedCode' in self.active_smells:
             self.detect_duplicated_code(source_lines, filepath)
+            if self.reference_index is not None:
+                self.detect_reference_clones(source_lines, filepath)
         
         if 'LargeParameterList' in self.active_smells:
             self.detect_large_parameter_lists(tree, filepath)
@@ -94,20 +440,113 @@ class CodeSmellDetector:
         if 'FeatureEnvy' in self.active_smells:
             self.detect_feature_envy(tree, source_code, filepath)
     
+    def analyze_incremental(self, filepath, source_code, state=None):
+        """
+        Re-analyze edited source given the AnalysisState of the previous
+        version. Top-level units whose content hash is unchanged keep their
+        findings (shifted if they moved); only changed units are re-run
+        through the unit detectors. DuplicatedCode compares lines across
+        units; it reuses the previous scan and only re-compares windows that
+        overlap the edit. self.results is patched in place and the new
+        AnalysisState is returned.
+        """
+        import hashlib
+        try:
+            tree = ast.parse(source_code)
+        except SyntaxError as e:
+            print(f"Syntax error in {filepath}: {e}")
+            return state
+        
+        source_lines = source_code.split('\n')
+        previous = {}
+        for unit in (state.units if state is not None else []):
+            previous.setdefault(unit['hash'], []).append(unit)
+        
+        units = []
+        changed_units = 0
+        for node in tree.body:
+            start = min([node.lineno] + [d.lineno for d in getattr(node, 'decorator_list', [])])
+            end = node.end_lineno
+            text = '\n'.join(source_lines[start - 1:end]).encode('utf-8')
+            digest = hashlib.blake2b(text, digest_size=16).hexdigest()
+            
+            matches = previous.get(digest)
+            if matches:
+                old = matches.pop(0)
+                delta = start - old['start']
+                findings = {smell: [shift_finding(smell, f, delta) if delta else f for f in items]
+                            for smell, items in old['findings'].items()}
+            else:
+                findings = self.run_unit_detectors(node, source_lines, filepath)
+                changed_units += 1
+            
+            units.append({
+                'name': getattr(node, 'name', type(node).__name__),
+                'start': start,
+                'end': end,
+                'hash': digest,
+                'findings': findings
+            })
+        
+        file_findings, duplicate_scan = self.run_file_detectors(
+            source_lines, filepath, state.duplicate_scan if state is not None else None)
+        new_state = AnalysisState(filepath, source_code, units, file_findings, changed_units, duplicate_scan)
+        
+        for smell in self.results:
+            self.results[smell] = [f for f in self.results[smell] if f.get('file') != filepath]
+        for smell, items in new_state.findings().items():
+            self.results[smell].extend(items)
+        return new_state
+    
+    def run_unit_detectors(self, node, source_lines, filepath):
+        """Run the active unit detectors on one subtree and return its findings"""
+        saved = self.results
+        self.results = {smell: [] for smell in saved}
+        try:
+            if 'LongMethod' in self.active_smells:
+                self.detect_long_methods(node, source_lines, filepath)
+            if 'GodClass' in self.active_smells:
+                self.detect_god_classes(node, filepath)
+            if 'LargeParameterList' in self.active_smells:
+                self.detect_large_parameter_lists(node, filepath)
+            if 'MagicNumbers' in self.active_smells:
+                self.detect_magic_numbers(node, source_lines, filepath)
+            if 'FeatureEnvy' in self.active_smells:
+                self.detect_feature_envy(node, None, filepath)
+            return {smell: self.results[smell] for smell in UNIT_SMELLS if self.results[smell]}
+        finally:
+            self.results = saved
+    
+    def run_file_detectors(self, source_lines, filepath, duplicate_scan=None):
+        """
+        Run the active whole-file detectors; returns (findings, duplicate_scan)
+        where duplicate_scan can be passed back in for the next version.
+        """
+        saved = self.results
+        self.results = {smell: [] for smell in saved}
+        try:
+            if 'DuplicatedCode' in self.active_smells:
+                duplicate_scan = self.detect_duplicated_code(source_lines, filepath, duplicate_scan)
+                if self.reference_index is not None:
+                    self.detect_reference_clones(source_lines, filepath)
+            return {smell: items for smell, items in self.results.items() if items}, duplicate_scan
+        finally:
+            self.results = saved
+    
     def detect_long_methods(self, tree, source_lines, filepath):
         """Detect methods that are too long"""
         max_lines = self.config['smells']['LongMethod']['max_lines']
+        names = qualified_names(tree)
         
         for node in ast.walk(tree):
             if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                start_line = node.lineno
-                end_line = node.end_lineno if hasattr(node, 'end_lineno') else start_line
-                method_lines = end_line - start_line + 1
+                start_line, end_line, method_lines = function_span(node)
                 
                 if method_lines > max_lines:
                     self.results['LongMethod'].append({
                         'file': filepath,
                         'method': node.name,
+                        'qualname': names[node],
                         'lines': f"{start_line}-{end_line}",
                         'length': method_lines,
                         'threshold': max_lines,
@@ -121,58 +560,46 @@ class CodeSmellDetector:
         
         for node in ast.walk(tree):
             if isinstance(node, ast.ClassDef):
-                methods = [n for n in node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
-                
-                # Count attributes initialized in __init__
-                attributes = 0
-                for item in node.body:
-                    if isinstance(item, ast.FunctionDef) and item.name == '__init__':
-                        for stmt in ast.walk(item):
-                            if isinstance(stmt, ast.Assign):
-                                for target in stmt.targets:
-                                    if isinstance(target, ast.Attribute):
-                                        if isinstance(target.value, ast.Name) and target.value.id == 'self':
-                                            attributes += 1
+                method_count, attributes = class_member_counts(node)
                 
-                if len(methods) > max_methods or attributes > max_attributes:
+                if method_count > max_methods or attributes > max_attributes:
                     self.results['GodClass'].append({
                         'file': filepath,
                         'class': node.name,
                         'lines': f"{node.lineno}-{node.end_lineno if hasattr(node, 'end_lineno') else node.lineno}",
-                        'methods': len(methods),
+                        'methods': method_count,
                         'attributes': attributes,
-                        'message': f"Class '{node.name}' has {len(methods)} methods and {attributes} attributes (thresholds: {max_methods} methods, {max_attributes} attributes)"
+                        'message': f"Class '{node.name}' has {method_count} methods and {attributes} attributes (thresholds: {max_methods} methods, {max_attributes} attributes)"
                     })
     
-    def detect_duplicated_code(self, source_lines, filepath):
-        """Detect duplicated code blocks"""
+    def detect_duplicated_code(self, source_lines, filepath, previous_scan=None):
+        """
+        Detect duplicated code blocks. previous_scan is the scan returned for
+        an earlier version of the file; when given, only windows affected by
+        the edit are re-compared. Returns this version's scan.
+        """
         min_lines = self.config['smells']['DuplicatedCode']['min_lines']
         min_similarity = self.config['smells']['DuplicatedCode']['min_similarity']
         
         # Normalize lines (remove whitespace and comments)
-        normalized_lines = []
-        for line in source_lines:
-            stripped = line.strip()
-            if stripped and not stripped.startswith('#'):
-                normalized_lines.append(stripped)
+        normalized_lines, _ = normalize_source_lines(source_lines)
+        
+        # First similar later block for every block
+        if previous_scan is not None and previous_scan[:2] == (min_lines, min_similarity):
+            _, _, old_lines, old_matches = previous_scan
+            matches = update_duplicate_matches(old_lines, old_matches, normalized_lines, min_lines, min_similarity)
+        else:
+            matches = duplicate_matches(normalized_lines, min_lines, min_similarity)
         
-        # Find duplicated sequences
         duplicates_found = []
-        for i in range(len(normalized_lines) - min_lines):
-            for j in range(i + min_lines, len(normalized_lines) - min_lines):
-                block1 = normalized_lines[i:i + min_lines]
-                block2 = normalized_lines[j:j + min_lines]
-                
-                similarity = sum(1 for a, b in zip(block1, block2) if a == b) / len(block1)
-                
-                if similarity >= min_similarity:
-                    # Check if not already reported
-                    if not any(d['lines1'].startswith(str(i+1)) for d in duplicates_found):
-                        duplicates_found.append({
-                            'lines1': f"{i+1}-{i+min_lines}",
-                            'lines2': f"{j+1}-{j+min_lines}",
-                            'similarity': round(similarity * 100, 1)
-                        })
+        for i, j in enumerate(matches):
+            if j >= 0:
+                similarity = block_similarity(normalized_lines, i, j, min_lines)
+                duplicates_found.append({
+                    'lines1': f"{i+1}-{i+min_lines}",
+                    'lines2': f"{j+1}-{j+min_lines}",
+                    'similarity': round(similarity * 100, 1)
+                })
         
         if duplicates_found:
             self.results['DuplicatedCode'].append({
@@ -180,23 +607,55 @@ class CodeSmellDetector:
                 'duplicates': duplicates_found,
                 'message': f"Found {len(duplicates_found)} duplicated code block(s)"
             })
+        return (min_lines, min_similarity, normalized_lines, matches)
+    
+    def detect_reference_clones(self, source_lines, filepath):
+        """
+        Detect code blocks copied from the reference corpus index. Consecutive
+        matching windows from the same corpus file are merged into one range.
+        """
+        index = self.reference_index
+        matches = []
+        previous = None
+        for position, (fingerprint, start_line, end_line) in enumerate(
+                window_fingerprints(source_lines, index.window)):
+            hit = index.lookup(fingerprint)
+            if hit is None:
+                continue
+            source, line = hit
+            if previous is not None and previous[0] == position - 1 and previous[1] == source:
+                match = matches[-1]
+                match['lines'] = f"{match['lines'].split('-')[0]}-{end_line}"
+            else:
+                matches.append({
+                    'lines': f"{start_line}-{end_line}",
+                    'source': index.source_path(source),
+                    'source_line': line
+                })
+            previous = (position, source)
+        
+        if matches:
+            self.results['DuplicatedCode'].append({
+                'file': filepath,
+                'reference_matches': matches,
+                'message': f"Found {len(matches)} code block(s) matching the reference corpus"
+            })
     
     def detect_large_parameter_lists(self, tree, filepath):
         """Detect methods with too many parameters"""
         max_params = self.config['smells']['LargeParameterList']['max_parameters']
+        names = qualified_names(tree)
         
         for node in ast.walk(tree):
             if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                param_count = len(node.args.args)
-                # Don't count 'self' or 'cls'
-                if param_count > 0 and node.args.args[0].arg in ['self', 'cls']:
-                    param_count -= 1
+                param_count = parameter_count(node)
                 
                 if param_count > max_params:
                     param_names = [arg.arg for arg in node.args.args]
                     self.results['LargeParameterList'].append({
                         'file': filepath,
                         'method': node.name,
+                        'qualname': names[node],
                         'line': node.lineno,
                         'parameter_count': param_count,
                         'parameters': param_names,
@@ -209,20 +668,9 @@ class CodeSmellDetector:
         allowed = self.config['smells']['MagicNumbers']['allowed_numbers']
         
         for node in ast.walk(tree):
-            if isinstance(node, ast.Num):
-                if node.n not in allowed:
-                    # Get context (function or class)
-                    context = self.get_context_for_node(tree, node)
-                    
-                    self.results['MagicNumbers'].append({
-                        'file': filepath,
-                        'line': node.lineno,
-                        'value': node.n,
-                        'context': context,
-                        'message': f"Magic number {node.n} found at line {node.lineno} in {context}"
-                    })
-            elif isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            if is_numeric_literal(node):
                 if node.value not in allowed:
+                    # Get context (function or class)
                     context = self.get_context_for_node(tree, node)
                     
                     self.results['MagicNumbers'].append({
@@ -245,39 +693,28 @@ class CodeSmellDetector:
     def detect_feature_envy(self, tree, source_code, filepath):
         """Detect methods that use other classes' data more than their own"""
         threshold = self.config['smells']['FeatureEnvy']['external_call_threshold']
+        names = qualified_names(tree)
         
         for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                # Skip if not a method (no self parameter)
-                if not node.args.args or node.args.args[0].arg != 'self':
-                    continue
-                
-                self_accesses = 0
-                external_accesses = 0
-                
-                for child in ast.walk(node):
-                    if isinstance(child, ast.Attribute):
-                        if isinstance(child.value, ast.Name):
-                            if child.value.id == 'self':
-                                self_accesses += 1
-                            else:
-                                external_accesses += 1
-                
-                total_accesses = self_accesses + external_accesses
-                if total_accesses > 0:
-                    external_ratio = external_accesses / total_accesses
-                    
-                    if external_ratio > threshold and external_accesses > 3:
-                        self.results['FeatureEnvy'].append({
-                            'file': filepath,
-                            'method': node.name,
-                            'line': node.lineno,
-                            'self_accesses': self_accesses,
-                            'external_accesses': external_accesses,
-                            'ratio': round(external_ratio, 2),
-                            'threshold': threshold,
-                            'message': f"Method '{node.name}' accesses external data {external_accesses} times vs self {self_accesses} times (ratio: {external_ratio:.2f})"
-                        })
+            # Skip if not a method (no self parameter)
+            if not is_envy_candidate(node):
+                continue
+            
+            self_accesses, external_accesses = attribute_access_counts(node)
+            external_ratio = external_access_ratio(self_accesses, external_accesses)
+            
+            if external_ratio is not None and external_ratio > threshold:
+                self.results['FeatureEnvy'].append({
+                    'file': filepath,
+                    'method': node.name,
+                    'qualname': names[node],
+                    'line': node.lineno,
+                    'self_accesses': self_accesses,
+                    'external_accesses': external_accesses,
+                    'ratio': round(external_ratio, 2),
+                    'threshold': threshold,
+                    'message': f"Method '{node.name}' accesses external data {external_accesses} times vs self {self_accesses} times (ratio: {external_ratio:.2f})"
+                })
     
     def generate_report(self):
         """Generate a formatted report of detected smells"""
@@ -309,6 +746,10 @@ class CodeSmellDetector:
                     if smell_type == 'DuplicatedCode' and 'duplicates' in smell:
                         for dup in smell['duplicates']:
                             report.append(f"    • Lines {dup['lines1']} duplicate Lines {dup['lines2']} ({dup['similarity']}% similar)")
+                    
+                    if smell_type == 'DuplicatedCode' and 'reference_matches' in smell:
+                        for match in smell['reference_matches']:
+                            report.append(f"    • Lines {match['lines']} match {match['source']}:{match['source_line']}")
         
         report.append(f"\n{'=' * 80}")
         return '\n'.join(report)
@@ -324,23 +765,50 @@ class CodeSmellDetector:
 
 def main():
     """Main entry point for the code smell detector"""
+    import argparse
     parser = argparse.ArgumentParser(description='Code Smell Detection Tool')
-    parser.add_argument('files', nargs='+', help='Python files to analyze')
+    parser.add_argument('files', nargs='+', help='Python files or .whl/.zip/.tar.gz archives to analyze')
     parser.add_argument('--config', default='config.yaml', help='Configuration file (default: config.yaml)')
     parser.add_argument('--only', help='Only check specified smells (comma-separated)')
     parser.add_argument('--exclude', help='Exclude specified smells (comma-separated)')
     parser.add_argument('--output', default='smell_report.txt', help='Output report file')
+    parser.add_argument('--reference-index', help='Fingerprint index of a reference corpus to match copied code against')
+    parser.add_argument('--jobs', type=int, default=1, help='Worker processes; >1 schedules the largest files first (default: 1)')
+    parser.add_argument('--store', help='Also record findings in this SQLite history database')
+    parser.add_argument('--label', help='Label for the run in the history database (e.g. a commit id)')
     
     args = parser.parse_args()
+    # Each file is analyzed once, however often it is named
+    args.files = list(dict.fromkeys(args.files))
     
     detector = CodeSmellDetector(args.config)
     detector.determine_active_smells(args.only, args.exclude)
     
+    if args.reference_index:
+        from fingerprint_index import FingerprintIndex
+        detector.reference_index = FingerprintIndex(args.reference_index)
+    
     print(f"Analyzing {len(args.files)} file(s)...")
     print(f"Active smells: {', '.join(detector.active_smells)}\n")
     
+    if args.jobs > 1:
+        from scheduler import analyze_parallel
+        files = []
+        for filepath in args.files:
+            if os.path.exists(filepath):
+                files.append(filepath)
+            else:
+                print(f"Warning: File not found - {filepath}")
+        wall_time = analyze_parallel(detector, files, args.jobs, args.config, args.reference_index)
+        print(f"Analyzed {len(files)} file(s) on {args.jobs} workers in {wall_time:.2f}s")
+        args.files = []
+    
     for filepath in args.files:
-        if Path(filepath).exists():
+        if os.path.exists(filepath) and is_archive(filepath):
+            print(f"Analyzing archive: {filepath}")
+            count = detector.analyze_archive(filepath)
+            print(f"  {count} Python file(s) analyzed")
+        elif os.path.exists(filepath):
             print(f"Analyzing: {filepath}")
             detector.analyze_file(filepath)
         else:
@@ -348,6 +816,13 @@ def main():
     
     print(detector.generate_report())
     detector.save_report(args.output)
+    
+    if args.store:
+        from findings_store import FindingsStore
+        store = FindingsStore(args.store)
+        run_id = store.record_run(detector.results, args.label)
+        store.close()
+        print(f"Findings recorded as run {run_id} in {args.store}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,408 @@
+"""
+Unit Tests for the Code Smell Detector
+Covers archive input, the history store, the metrics store, the scheduler,
+the reference corpus index and incremental re-analysis on small generated
+sources.
+"""
+
+import argparse
+import copy
+import io
+import json
+import os
+import random
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from contextlib import redirect_stdout
+
+from smell_detector import CodeSmellDetector, duplicate_matches, update_duplicate_matches, iter_archive_sources
+from findings_store import FindingsStore
+from metrics_store import MetricsStore, print_sweep
+from scheduler import CostModel, analyze_parallel, plan_tasks
+from fingerprint_index import FingerprintIndex, build_index
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CONFIG = os.path.join(HERE, 'config.yaml')
+
+
+def make_detector(only=None):
+    """Detector with the repo config and all (or only the given) smells active"""
+    detector = CodeSmellDetector(CONFIG)
+    detector.determine_active_smells(only)
+    return detector
+
+
+def analyze(source, filepath='sample.py', only=None):
+    """Return the results dict of a full analysis of source"""
+    detector = make_detector(only)
+    detector.analyze_source(source, filepath)
+    return detector.results
+
+
+class TestFindingsStore(unittest.TestCase):
+    """History store keys and run comparisons"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = FindingsStore(os.path.join(self.directory.name, 'history.db'))
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def test_same_named_methods_in_different_classes_are_distinct(self):
+        """
+        Test that a new method sharing its name with an old one is reported.
+        Verifies findings are keyed by Class.method, not the bare name.
+        """
+        first = "class A:\n    def run(self, a, b, c, d, e, f):\n        pass\n"
+        second = first + "\n\nclass B:\n    def run(self, a, b, c, d, e, f):\n        pass\n"
+        base = self.store.record_run(analyze(first, only='LargeParameterList'))
+        self.store.record_run(analyze(second, only='LargeParameterList'))
+
+        new = self.store.new_since(base)
+
+        self.assertEqual([(path, smell, line) for path, smell, line, _ in new],
+                         [('sample.py', 'LargeParameterList', 7)])
+
+    def test_files_getting_worse_needs_a_base_run(self):
+        """
+        Test that a single run is not compared against nothing.
+        Verifies files_getting_worse is empty until there are two runs.
+        """
+        source = "def f(a, b, c, d, e, f):\n    return 42\n"
+        self.store.record_run(analyze(source))
+
+        self.assertEqual(self.store.files_getting_worse(), [])
+
+        self.store.record_run(analyze(source + "\n\ndef g(a, b, c, d, e, f):\n    return 43\n"))
+        self.assertEqual([path for path, _, _ in self.store.files_getting_worse()], ['sample.py'])
+
+
+ARCHIVE_MEMBERS = {
+    'pkg/module.py': b"def f(a, b, c, d, e, f):\n    return 42\n",
+    'pkg/data.txt': b"def g(a, b, c, d, e, f):\n    pass\n",
+    'pkg/latin.py': b"name = '\xe9t\xe9'\n",
+}
+
+
+class TestArchiveInput(unittest.TestCase):
+    """Wheels, zips and sdists analyzed without unpacking"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.zip_path = os.path.join(self.directory.name, 'sample-1.0-py3-none-any.whl')
+        with zipfile.ZipFile(self.zip_path, 'w') as archive:
+            archive.writestr('pkg/', b'')
+            for name, data in ARCHIVE_MEMBERS.items():
+                archive.writestr(name, data)
+        self.tar_path = os.path.join(self.directory.name, 'sample-1.0.tar.gz')
+        with tarfile.open(self.tar_path, 'w:gz') as archive:
+            for name, data in ARCHIVE_MEMBERS.items():
+                info = tarfile.TarInfo(f'sample-1.0/{name}')
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_only_python_members_are_read(self):
+        """
+        Test listing the members of a wheel and an sdist.
+        Verifies 'archive!/inner/path.py' paths and that other files are skipped.
+        """
+        self.assertEqual([path for path, _ in iter_archive_sources(self.zip_path)],
+                         [f'{self.zip_path}!/pkg/module.py', f'{self.zip_path}!/pkg/latin.py'])
+        self.assertEqual([path for path, _ in iter_archive_sources(self.tar_path)],
+                         [f'{self.tar_path}!/sample-1.0/pkg/module.py', f'{self.tar_path}!/sample-1.0/pkg/latin.py'])
+
+    def test_undecodable_members_are_skipped(self):
+        """
+        Test analyzing both archives end to end.
+        Verifies findings carry member paths and non-UTF-8 members are reported, not analyzed.
+        """
+        for archive_path, inner in ((self.zip_path, 'pkg'), (self.tar_path, 'sample-1.0/pkg')):
+            detector = make_detector('LargeParameterList')
+            output = io.StringIO()
+            with redirect_stdout(output):
+                analyzed = detector.analyze_archive(archive_path)
+
+            self.assertEqual(analyzed, 1)
+            self.assertEqual([f['file'] for f in detector.results['LargeParameterList']],
+                             [f'{archive_path}!/{inner}/module.py'])
+            self.assertIn(f'Encoding error in {archive_path}!/{inner}/latin.py', output.getvalue())
+
+
+ENVIOUS_CLASS = """
+
+class Invoice:
+    def render(self, order):
+        return (order.customer.name, order.customer.address, order.total, order.tax, self.title)
+"""
+
+# (max_lines, max_parameters, max_methods, max_attributes, external_call_threshold, allowed_numbers)
+THRESHOLD_SETS = [
+    (50, 5, 15, 10, 0.6, [0, 1, -1]),
+    (10, 2, 3, 3, 0.3, [0, 1]),
+    (5, 1, 1, 1, 0.9, [0, 1, -1, 2, 100]),
+]
+
+
+def smells_config(max_lines, max_parameters, max_methods, max_attributes, external_call_threshold, allowed_numbers):
+    """The repo config's smells section with the given thresholds"""
+    smells = copy.deepcopy(make_detector().config['smells'])
+    smells['LongMethod']['max_lines'] = max_lines
+    smells['LargeParameterList']['max_parameters'] = max_parameters
+    smells['GodClass'].update(max_methods=max_methods, max_attributes=max_attributes)
+    smells['FeatureEnvy']['external_call_threshold'] = external_call_threshold
+    smells['MagicNumbers']['allowed_numbers'] = allowed_numbers
+    return smells
+
+
+class TestMetricsStore(unittest.TestCase):
+    """Threshold evaluation from recorded metrics against full analyses"""
+
+    def setUp(self):
+        with open(os.path.join(HERE, 'smelly_code.py'), encoding='utf-8') as f:
+            self.source = f.read() + ENVIOUS_CLASS
+        self.store = MetricsStore()
+        self.store.add_source(self.source, 'sample.py')
+
+    def detector_counts(self, smells):
+        """Finding counts per smell from analyze_source with the given thresholds"""
+        detector = make_detector()
+        detector.config['smells'] = smells
+        detector.analyze_source(self.source, 'sample.py')
+        return {smell: len(detector.results[smell]) for smell in smells if smell != 'DuplicatedCode'}
+
+    def test_evaluate_matches_full_analysis(self):
+        """
+        Test evaluating several threshold sets, before and after a save/load round trip.
+        Verifies every count equals the number of findings analyze_source reports.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'metrics.bin')
+            self.store.save(path)
+            loaded = MetricsStore.load(path)
+
+        envy_counts = []
+        for thresholds in THRESHOLD_SETS:
+            smells = smells_config(*thresholds)
+            expected = self.detector_counts(smells)
+            self.assertEqual(self.store.evaluate(smells), expected)
+            self.assertEqual(loaded.evaluate(smells), expected)
+            envy_counts.append(expected['FeatureEnvy'])
+        # The sample has an envious method that the strictest threshold lets through
+        self.assertEqual(envy_counts, [1, 1, 0])
+
+    def test_sweep_prints_the_detector_counts(self):
+        """
+        Test the sweep output for LongMethod and LargeParameterList values.
+        Verifies each printed count matches a full analysis with that threshold.
+        """
+        args = argparse.Namespace(max_lines='5,10,50', max_parameters='1,5', external_call_threshold=None,
+                                  max_methods=None, max_attributes=None, allowed_numbers=None)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            print_sweep(self.store, args)
+
+        expected = []
+        for smell, values in (('LongMethod', (5, 10, 50)), ('LargeParameterList', (1, 5))):
+            for value in values:
+                smells = smells_config(*THRESHOLD_SETS[0])
+                smells[smell]['max_lines' if smell == 'LongMethod' else 'max_parameters'] = value
+                expected.append(f"  {value:>8}: {self.detector_counts(smells)[smell]}")
+        printed = [line for line in output.getvalue().splitlines() if line.startswith('  ')]
+        self.assertEqual(printed, expected)
+
+
+class TestScheduler(unittest.TestCase):
+    """Cost-model task planning and the process-pool analysis"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        # A private config copy, so recorded timings stay out of the repo
+        self.config = os.path.join(self.directory.name, 'config.yaml')
+        with open(CONFIG, 'rb') as src, open(self.config, 'wb') as dst:
+            dst.write(src.read())
+        self.files = []
+        for name, units in (('small', 1), ('large', 40), ('medium', 6)):
+            path = os.path.join(self.directory.name, f'{name}.py')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('\n\n'.join(unit_source(f'{name}_{i}', i) for i in range(units)))
+            self.files.append(path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_outlier_is_split_and_tasks_run_longest_first(self):
+        """
+        Test planning three files of very different sizes on two workers.
+        Verifies the outlier becomes one task per smell and costs only decrease.
+        """
+        smells = ['LongMethod', 'MagicNumbers', 'FeatureEnvy']
+        cost_model = CostModel(os.path.join(self.directory.name, 'no-timings.json'))
+
+        tasks = plan_tasks(self.files, smells, cost_model, jobs=2)
+
+        small, large, medium = self.files
+        self.assertEqual([(path, task_smells) for path, task_smells, _ in tasks],
+                         [(large, ['LongMethod']), (large, ['MagicNumbers']), (large, ['FeatureEnvy']),
+                          (medium, smells), (small, smells)])
+        costs = [cost for _, _, cost in tasks]
+        self.assertEqual(costs, sorted(costs, reverse=True))
+        self.assertEqual([path for path, _, _ in plan_tasks(self.files, smells, cost_model, jobs=1)],
+                         [large, medium, small])
+
+    def test_parallel_results_equal_a_serial_run(self):
+        """
+        Test --jobs 2 against analyzing the same files one by one.
+        Verifies merged findings are identical and a repeated path is analyzed once.
+        """
+        serial = CodeSmellDetector(self.config)
+        serial.determine_active_smells()
+        for path in self.files:
+            serial.analyze_file(path)
+
+        parallel = CodeSmellDetector(self.config)
+        parallel.determine_active_smells()
+        analyze_parallel(parallel, self.files + [self.files[1]], 2, self.config)
+
+        self.assertEqual(parallel.results, serial.results)
+        self.assertTrue(parallel.results['LargeParameterList'])
+
+
+def numbered_block(prefix, count):
+    """Source lines that are all distinct, so every window fingerprint is unique"""
+    return [f"{prefix}_{i} = compute({i}, '{prefix}')" for i in range(count)]
+
+
+class TestFingerprintIndex(unittest.TestCase):
+    """Reference corpus index building and matching"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.corpus = os.path.join(self.directory.name, 'corpus')
+        os.makedirs(self.corpus)
+        for name in ('vendored_a', 'vendored_b'):
+            with open(os.path.join(self.corpus, f'{name}.py'), 'w', encoding='utf-8') as f:
+                f.write('\n'.join(numbered_block(name, 40) + numbered_block('shared', 10)) + '\n')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_spilled_runs_build_the_same_index(self):
+        """
+        Test building with tiny on-disk runs against one in-memory run.
+        Verifies identical files and that shared code keeps its first source.
+        """
+        small = os.path.join(self.directory.name, 'small.idx')
+        large = os.path.join(self.directory.name, 'large.idx')
+        count = build_index(small, [self.corpus], window=5, run_size=7)
+        self.assertEqual(build_index(large, [self.corpus], window=5), count)
+        with open(small, 'rb') as f, open(large, 'rb') as g:
+            self.assertEqual(f.read(), g.read())
+        self.assertEqual([name for name in os.listdir(self.directory.name) if name.endswith('.run')], [])
+
+        index = FingerprintIndex(small)
+        # 2 x 46 windows, minus the 6 shared windows stored once
+        self.assertEqual(len(index), 86)
+        detector = make_detector('DuplicatedCode')
+        detector.reference_index = index
+        detector.detect_reference_clones(numbered_block('shared', 10), 'copy.py')
+        match = detector.results['DuplicatedCode'][0]['reference_matches'][0]
+        self.assertEqual(match['source'], os.path.join(self.corpus, 'vendored_a.py'))
+        index.close()
+
+    def test_copied_block_is_reported_as_one_range(self):
+        """
+        Test that overlapping window hits of one copied block are merged.
+        Verifies a 30-line copy yields one match covering all 30 lines.
+        """
+        path = os.path.join(self.directory.name, 'corpus.idx')
+        build_index(path, [self.corpus], window=5)
+        index = FingerprintIndex(path)
+        detector = make_detector('DuplicatedCode')
+        detector.reference_index = index
+        source = numbered_block('local', 8) + numbered_block('vendored_b', 30) + numbered_block('other', 8)
+
+        detector.detect_reference_clones(source, 'copy.py')
+        index.close()
+
+        finding = detector.results['DuplicatedCode'][0]
+        self.assertEqual(finding['reference_matches'], [
+            {'lines': '9-38', 'source': os.path.join(self.corpus, 'vendored_b.py'), 'source_line': 1}])
+        self.assertEqual(finding['message'], "Found 1 code block(s) matching the reference corpus")
+
+
+def canonical(results):
+    """Findings per smell in a stable order, for comparing two analyses"""
+    return {smell: sorted(json.dumps(f, sort_keys=True) for f in items) for smell, items in results.items() if items}
+
+
+def unit_source(name, offset):
+    """A function with a long parameter list, magic numbers and a copied loop body"""
+    return (f"def {name}(a, b, c, d, e, f):\n"
+            f"    total = a + {offset}\n"
+            f"    for item in b:\n"
+            f"        total += item * 42\n"
+            f"        total -= item // 7\n"
+            f"        if total > 1000:\n"
+            f"            total = 0\n"
+            f"    return total\n")
+
+
+class TestIncrementalAnalysis(unittest.TestCase):
+    """analyze_incremental against a full analyze_source of the same text"""
+
+    def setUp(self):
+        self.units = [unit_source(f"unit_{i}", i) for i in range(6)]
+        self.detector = make_detector()
+        self.state = self.detector.analyze_incremental('sample.py', '\n\n'.join(self.units))
+
+    def assertMatchesFullAnalysis(self, units, changed_units):
+        source = '\n\n'.join(units)
+        self.state = self.detector.analyze_incremental('sample.py', source, self.state)
+        self.assertEqual(canonical(self.detector.results), canonical(analyze(source)))
+        self.assertEqual(self.state.changed_units, changed_units)
+
+    def test_edit_move_and_delete_a_unit(self):
+        """
+        Test a sequence of edits on one state.
+        Verifies reused, shifted and re-run findings equal a fresh analysis.
+        """
+        self.assertIn('DuplicatedCode', canonical(self.detector.results))
+
+        edited = list(self.units)
+        edited[2] = edited[2].replace("item * 42", "item * 43").replace("return total", "return total or 1")
+        self.assertMatchesFullAnalysis(edited, 1)
+
+        moved = edited[:1] + edited[4:5] + edited[1:4] + edited[5:]
+        self.assertMatchesFullAnalysis(moved, 0)
+
+        deleted = moved[:2] + moved[3:]
+        self.assertMatchesFullAnalysis(deleted, 0)
+
+    def test_updated_duplicate_matches_equal_a_full_scan(self):
+        """
+        Test the duplicate match update on random line edits.
+        Verifies it always agrees with duplicate_matches on the new lines.
+        """
+        rng = random.Random(7)
+        lines = [rng.choice('abcd') for _ in range(60)]
+        matches = duplicate_matches(lines, 5, 0.8)
+        for _ in range(200):
+            edited = list(lines)
+            start = rng.randrange(len(edited) + 1)
+            stop = min(len(edited), start + rng.randrange(4))
+            edited[start:stop] = [rng.choice('abcde') for _ in range(rng.randrange(4))]
+            updated = update_duplicate_matches(lines, matches, edited, 5, 0.8)
+            self.assertEqual(updated, duplicate_matches(edited, 5, 0.8))
+            lines, matches = edited, updated
+
+
+if __name__ == '__main__':
+    unittest.main()
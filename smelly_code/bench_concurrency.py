@@ -0,0 +1,86 @@
+"""
+Concurrent Checkout Benchmark
+Runs checkout/return cycles from many threads against a library whose
+storage backend takes a fixed time per write (like a database round trip),
+and reports throughput as the number of distinct books grows. With ISBN lock
+striping, threads working on different books do not wait for each other.
+Usage: python bench_concurrency.py [--threads 16] [--cycles 50] [--latency-ms 2]
+"""
+
+import argparse
+import datetime
+import threading
+import time
+
+from smelly_code import LibraryManagementSystem
+
+
+class SlowStorage:
+    """Storage stand-in that only sleeps; sleeping releases the GIL like real I/O"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def insert_books(self, books):
+        pass
+
+    def insert_members(self, members):
+        pass
+
+    def record_checkout(self, book, transaction):
+        time.sleep(self.latency)
+
+    def record_return(self, book, transaction):
+        time.sleep(self.latency)
+
+    def save_overdue_fees(self, fees, overdue_count=0):
+        pass
+
+
+def run(distinct_books, threads, cycles, latency):
+    """Return checkouts+returns per second for `threads` threads sharing distinct_books ISBNs"""
+    library = LibraryManagementSystem()
+    library.storage = SlowStorage(latency)
+    for i in range(distinct_books):
+        library.add_book(f"Book {i}", "Author", f"978-{i:010d}", "Fiction", threads)
+    library.register_members([(f"Member {i}", None, None, None, "Regular") for i in range(threads)])
+    checkout_date = datetime.datetime(2025, 1, 1)
+    due_date = checkout_date + datetime.timedelta(days=14)
+    start = threading.Barrier(threads + 1)
+
+    def worker(member_id):
+        isbn = f"978-{member_id % distinct_books:010d}"
+        start.wait()
+        for _ in range(cycles):
+            library.process_book_checkout(member_id, isbn, checkout_date, due_date, "Staff", "Desk")
+            library.process_book_return(member_id, isbn)
+
+    workers = [threading.Thread(target=worker, args=(member_id,)) for member_id in range(1, threads + 1)]
+    for thread in workers:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return 2 * threads * cycles / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent checkout throughput benchmark')
+    parser.add_argument('--threads', type=int, default=16, help='Worker threads (default: 16)')
+    parser.add_argument('--cycles', type=int, default=50, help='Checkout/return cycles per thread (default: 50)')
+    parser.add_argument('--latency-ms', type=float, default=2.0, help='Simulated storage write latency (default: 2)')
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads, {args.latency_ms} ms per storage write")
+    print(f"{'books':>8} {'ops/s':>10}")
+    books = 1
+    while books <= args.threads:
+        ops = run(books, args.threads, args.cycles, args.latency_ms / 1000)
+        print(f"{books:>8} {ops:>10.0f}")
+        books *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Notification Delivery Benchmark
+Measures delivery throughput of DeliveryPipeline against a simulated
+transport that takes a fixed time per batch and allows a limited number of
+concurrent connections, for an increasing number of workers, and the time
+the billing side spends submitting.
+Usage: python bench_delivery.py [--notifications 5000] [--limit 8] [--latency-ms 20]
+"""
+
+import argparse
+import asyncio
+import time
+
+from notification_delivery import DeliveryPipeline
+
+
+class SimulatedTransport:
+    """Fixed latency per batch, at most `limit` batches in flight"""
+
+    def __init__(self, latency, limit):
+        self.latency = latency
+        self.limit = asyncio.Semaphore(limit)
+
+    async def send_batch(self, deliveries):
+        async with self.limit:
+            await asyncio.sleep(self.latency)
+        return deliveries, []
+
+
+async def run(workers, notifications, batch_size, latency, limit):
+    """Return (seconds spent submitting, notifications delivered per second)"""
+    pipeline = DeliveryPipeline(SimulatedTransport(latency, limit), workers=workers,
+                                batch_size=batch_size, queue_size=notifications)
+    await pipeline.start()
+    started = time.perf_counter()
+    for i in range(notifications):
+        pipeline.submit(i % 1000 + 1, f"Notice {i}")
+    submitted = time.perf_counter() - started
+    await pipeline.stop()
+    return submitted, notifications / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Notification delivery throughput benchmark')
+    parser.add_argument('--notifications', type=int, default=5000, help='Notifications to deliver (default: 5000)')
+    parser.add_argument('--batch-size', type=int, default=10, help='Deliveries per batch (default: 10)')
+    parser.add_argument('--limit', type=int, default=8, help='Transport connection limit (default: 8)')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='Transport time per batch (default: 20)')
+    args = parser.parse_args()
+
+    print(f"{args.notifications} notifications, batches of {args.batch_size}, "
+          f"{args.latency_ms} ms per batch, transport limit {args.limit}")
+    print(f"{'workers':>8} {'submit ms':>10} {'sent/s':>10}")
+    workers = 1
+    while workers <= args.limit * 2:
+        submitted, rate = asyncio.run(run(workers, args.notifications, args.batch_size,
+                                          args.latency_ms / 1000, args.limit))
+        print(f"{workers:>8} {submitted * 1000:>10.1f} {rate:>10.0f}")
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Record Memory Benchmark
+Compares the memory held by N loans stored as the original 7-key dicts with
+the same loans stored in the columnar TransactionLog, and N members stored as
+dicts with the same members stored as slotted Member records.
+Usage: python bench_memory.py [--loans 200000] [--members 50000]
+"""
+
+import argparse
+import datetime
+import tracemalloc
+
+from smelly_code import Member, TransactionLog, intern_value
+
+
+STAFF = ["Librarian A", "Librarian B", "Librarian C", "Assistant D"]
+LOCATIONS = ["Main Desk", "East Wing", "Branch 2", "Self Checkout"]
+
+
+def copy_str(value):
+    """Return an equal but distinct string object"""
+    return value[:1] + value[1:]
+
+
+def loan_rows(count):
+    """Yield loan fields the way a parser would: fresh string objects every row"""
+    start = datetime.datetime(2025, 1, 1)
+    for i in range(count):
+        checkout_date = start + datetime.timedelta(minutes=i)
+        yield {
+            'member_id': i % 5000 + 1,
+            'isbn': f"978-{i % 100000:010d}",
+            'checkout_date': checkout_date,
+            'due_date': checkout_date + datetime.timedelta(days=14),
+            'staff_name': copy_str(STAFF[i % len(STAFF)]),
+            'location': copy_str(LOCATIONS[i % len(LOCATIONS)]),
+            'returned': False
+        }
+
+
+def member_rows(count):
+    """Yield member fields with fresh string objects every row"""
+    registered = datetime.datetime(2025, 1, 1)
+    for i in range(count):
+        yield {
+            'id': i + 1,
+            'name': f"Member {i}",
+            'email': f"member{i}@email.com",
+            'phone': f"555-{i % 10000:04d}",
+            'address': f"{i} Main St",
+            'member_type': copy_str(["Student", "Faculty", "Regular"][i % 3]),
+            'borrowed_books': [],
+            'registration_date': registered
+        }
+
+
+def measure(build):
+    """Return bytes still allocated by the structure build() returns"""
+    tracemalloc.start()
+    records = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return current
+
+
+def loans_as_dicts(count):
+    return [dict(row) for row in loan_rows(count)]
+
+
+def loans_as_log(count):
+    log = TransactionLog()
+    for row in loan_rows(count):
+        log.append(row)
+    return log
+
+
+def members_as_dicts(count):
+    return [dict(row) for row in member_rows(count)]
+
+
+def members_as_records(count):
+    members = []
+    for row in member_rows(count):
+        row['member_type'] = intern_value(row['member_type'])
+        members.append(Member(**row))
+    return members
+
+
+def report(label, count, dict_bytes, compact_bytes):
+    print(f"{count} {label}")
+    print(f"  dicts:   {dict_bytes / count:7.1f} bytes each")
+    print(f"  compact: {compact_bytes / count:7.1f} bytes each")
+    print(f"  reduction: {dict_bytes / compact_bytes:.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record memory benchmark')
+    parser.add_argument('--loans', type=int, default=200000)
+    parser.add_argument('--members', type=int, default=50000)
+    args = parser.parse_args()
+
+    report("loans", args.loans,
+           measure(lambda: loans_as_dicts(args.loans)), measure(lambda: loans_as_log(args.loans)))
+    report("members", args.members,
+           measure(lambda: members_as_dicts(args.members)), measure(lambda: members_as_records(args.members)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+"""
+Scale Benchmark Suite
+Builds libraries of 10^3 up to 10^7 books, members and loans with a seeded
+generator, then measures latency percentiles and throughput of every public
+LibraryManagementSystem operation and the search functions at each scale.
+Each scale runs in a fresh worker process so its peak RSS is its own
+(from resource on Unix, psutil on Windows, or else tracemalloc's peak of
+Python allocations, which leaves out interpreter overhead).
+Results are written as JSON; --compare flags operations whose median latency
+grew beyond a tolerance against an earlier results file.
+Usage: python bench_scale.py [--scales 1000,10000,100000] [--samples 1000]
+                             [--output bench_scale.json] [--compare baseline.json]
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from smelly_code import LibraryManagementSystem, search_books, search_books_by_author, search_books_by_category
+
+
+START = datetime.datetime(2025, 1, 1)
+CATEGORIES = [f"Category {i}" for i in range(50)]
+MEMBER_TYPES = ["Student", "Faculty", "Regular"]
+BATCH = 10000
+
+
+def isbn_for(i):
+    return f"978-{i:010d}"
+
+
+def author_for(i, scale):
+    """About 20 books per author"""
+    return f"Author {i % max(scale // 20, 1)}"
+
+
+def build_library(scale, seed):
+    """Deterministically build a library with `scale` books, members and loans"""
+    rng = random.Random(seed)
+    library = LibraryManagementSystem()
+    for start in range(0, scale, BATCH):
+        library.add_books([(f"Book {i}", author_for(i, scale), isbn_for(i), CATEGORIES[i % len(CATEGORIES)], 2)
+                           for i in range(start, min(start + BATCH, scale))])
+        library.register_members([(f"Member {i}", f"member{i}@email.com", f"555-{i % 10000:04d}",
+                                   f"{i} Main St", MEMBER_TYPES[i % len(MEMBER_TYPES)])
+                                  for i in range(start, min(start + BATCH, scale))])
+    for i in range(scale):
+        checkout_date = START + datetime.timedelta(minutes=i)
+        library.process_book_checkout(rng.randint(1, scale), isbn_for(rng.randrange(scale)), checkout_date,
+                                      checkout_date + datetime.timedelta(days=rng.randint(7, 28)),
+                                      "Librarian A", "Main Desk")
+    return library
+
+
+class NullWriter:
+    """Writer that discards everything, so report streaming is timed without buffering"""
+
+    def write(self, text):
+        return len(text)
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+def measure(operation, arguments):
+    """Call operation(*args) for every args tuple; return latency/throughput stats"""
+    latencies = []
+    for args in arguments:
+        started = time.perf_counter_ns()
+        operation(*args)
+        latencies.append(time.perf_counter_ns() - started)
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        'count': len(latencies),
+        'p50_us': percentile(latencies, 0.50) / 1000,
+        'p90_us': percentile(latencies, 0.90) / 1000,
+        'p99_us': percentile(latencies, 0.99) / 1000,
+        'max_us': latencies[-1] / 1000,
+        'ops_per_sec': len(latencies) / (total / 1e9) if total else None
+    }
+
+
+def peak_memory_kib():
+    """Return (peak memory of this process in KiB, how it was measured)"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in KiB on Linux
+        return (peak // 1024 if sys.platform == 'darwin' else peak), 'ru_maxrss'
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        # peak_wset is the Windows peak working set
+        return getattr(info, 'peak_wset', info.rss) // 1024, 'psutil'
+    return tracemalloc.get_traced_memory()[1] // 1024, 'tracemalloc'
+
+
+def run_scale(scale, samples, seed):
+    """Build one library and time every operation on it; runs in a worker process"""
+    if resource is None and psutil is None:
+        tracemalloc.start()
+    started = time.perf_counter()
+    library = build_library(scale, seed)
+    build_seconds = time.perf_counter() - started
+    rng = random.Random(seed + 1)
+    billing_date = START + datetime.timedelta(days=60)
+
+    def member_ids():
+        return [rng.randint(1, scale) for _ in range(samples)]
+
+    def authors():
+        return [author_for(rng.randrange(scale), scale) for _ in range(samples)]
+
+    checkouts = [(rng.randint(1, scale), isbn_for(rng.randrange(scale)), billing_date,
+                  billing_date + datetime.timedelta(days=14), "Librarian B", "East Wing") for _ in range(samples)]
+    operations = {
+        'add_book': (library.add_book, [(f"New Book {i}", "New Author", isbn_for(scale + i), CATEGORIES[0], 1)
+                                        for i in range(samples)]),
+        'register_member': (library.register_member, [(f"New Member {i}", None, None, None, "Regular")
+                                                      for i in range(samples)]),
+        'process_book_checkout': (library.process_book_checkout, checkouts),
+        'process_book_return': (library.process_book_return, [(member_id, isbn) for member_id, isbn, *_ in checkouts]),
+        'calculate_and_process_overdue_fees_with_notifications_and_updates': (
+            library.calculate_and_process_overdue_fees_with_notifications_and_updates,
+            [(member_id, billing_date) for member_id in member_ids()]),
+        'process_overdue_fees_for_all_members': (library.process_overdue_fees_for_all_members,
+                                                 [(billing_date,)] * max(1, min(samples, 3))),
+        'get_member_notifications': (library.get_member_notifications, [(m,) for m in member_ids()]),
+        'count_notifications_sent': (library.count_notifications_sent, [(m,) for m in member_ids()]),
+        'generate_member_report': (library.generate_member_report, [(m,) for m in member_ids()]),
+        'write_member_reports': (library.write_member_reports, [(NullWriter(),)] * min(samples, 3)),
+        'search_books_by_author': (search_books_by_author, [(library, a) for a in authors()]),
+        'search_books_by_category': (search_books_by_category,
+                                     [(library, rng.choice(CATEGORIES)) for _ in range(min(samples, 100))]),
+        'search_books_prefix_page': (lambda *args: list(search_books(*args)),
+                                     [(library, 'author', "Author 1", 'prefix', 0, 20) for _ in range(samples)]),
+    }
+    results = {name: measure(operation, arguments) for name, (operation, arguments) in operations.items()}
+    peak_kib, peak_source = peak_memory_kib()
+    return {
+        'scale': scale,
+        'books': len(library.books),
+        'members': len(library.members),
+        'transactions': len(library.transactions),
+        'build_seconds': build_seconds,
+        'peak_rss_kib': peak_kib,
+        'peak_rss_source': peak_source,
+        'operations': results
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return (scale, operation, old_p50, new_p50) for medians that grew by more than tolerance"""
+    old = {(entry['scale'], name): stats['p50_us']
+           for entry in baseline['scales'] for name, stats in entry['operations'].items()}
+    regressions = []
+    for entry in results['scales']:
+        for name, stats in entry['operations'].items():
+            previous = old.get((entry['scale'], name))
+            if previous and stats['p50_us'] > previous * tolerance:
+                regressions.append((entry['scale'], name, previous, stats['p50_us']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Library Management System scale benchmark')
+    parser.add_argument('--scales', default='1000,10000,100000',
+                        help='Comma-separated library sizes, up to 10000000 (default: 1000,10000,100000)')
+    parser.add_argument('--samples', type=int, default=1000, help='Timed calls per operation (default: 1000)')
+    parser.add_argument('--seed', type=int, default=42, help='Generator seed (default: 42)')
+    parser.add_argument('--output', default='bench_scale.json', help='Results file (default: bench_scale.json)')
+    parser.add_argument('--compare', help='Earlier results file to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help='Allowed p50 growth factor before flagging a regression (default: 1.5)')
+    args = parser.parse_args()
+
+    scales = [int(value) for value in args.scales.split(',') if value.strip()]
+    results = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'seed': args.seed,
+        'samples': args.samples,
+        'scales': []
+    }
+    for scale in scales:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            entry = pool.submit(run_scale, scale, args.samples, args.seed).result()
+        results['scales'].append(entry)
+        print(f"scale {scale}: built in {entry['build_seconds']:.1f}s, peak RSS {entry['peak_rss_kib'] / 1024:.0f} MiB "
+              f"({entry['peak_rss_source']})")
+        for name, stats in entry['operations'].items():
+            print(f"  {name:<68} p50 {stats['p50_us']:>10.1f}us  p99 {stats['p99_us']:>10.1f}us")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for scale, name, previous, current in regressions:
+            print(f"REGRESSION scale {scale} {name}: p50 {previous:.1f}us -> {current:.1f}us")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
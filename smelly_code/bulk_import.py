@@ -0,0 +1,168 @@
+"""
+Streaming Bulk Import for the Library Management System
+Reads books or members from CSV (with a header row) or JSON Lines files one
+row at a time, validates each row and adds the valid ones through add_books /
+register_members in fixed-size batches, so memory use does not grow with
+the file. Rejected rows are counted, the first few are kept in the report,
+and all of them can be written to a JSONL rejects file.
+
+Usage: python bulk_import.py books branch_books.csv [--db library.db] [--rejects rejects.jsonl]
+"""
+
+import argparse
+import csv
+import json
+
+from smelly_code import LibraryManagementSystem
+
+
+BOOK_COLUMNS = ('title', 'author', 'isbn', 'category', 'copies')
+MEMBER_COLUMNS = ('name', 'email', 'phone', 'address', 'member_type')
+
+
+class ImportReport:
+    """Outcome of one import: counts plus the first max_rejected rejected rows"""
+
+    def __init__(self, max_rejected=100):
+        self.imported = 0
+        self.rejected_count = 0
+        self.rejected = []
+        self.max_rejected = max_rejected
+
+    def reject(self, line, reason):
+        self.rejected_count += 1
+        if len(self.rejected) < self.max_rejected:
+            self.rejected.append((line, reason))
+
+    def __repr__(self):
+        return f"ImportReport(imported={self.imported}, rejected={self.rejected_count})"
+
+
+def iter_rows(path):
+    """
+    Yield (line_number, row) pairs from a .csv or .jsonl file. row is a dict,
+    or a ValueError describing a line that could not be parsed.
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.endswith('.csv'):
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_number, ValueError(f"invalid JSON: {e}")
+                    continue
+                if not isinstance(row, dict):
+                    row = ValueError("expected a JSON object")
+                yield line_number, row
+
+
+def required_text(row, column):
+    value = row.get(column)
+    if value is None or not str(value).strip():
+        raise ValueError(f"missing {column}")
+    return str(value).strip()
+
+
+def optional_text(row, column):
+    value = row.get(column)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def validate_book(row):
+    """Return an add_books row tuple, or raise ValueError"""
+    copies = row.get('copies')
+    try:
+        copies = int(copies)
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid copies: {copies!r}")
+    if copies < 0:
+        raise ValueError(f"invalid copies: {copies!r}")
+    return (required_text(row, 'title'), required_text(row, 'author'), required_text(row, 'isbn'),
+            required_text(row, 'category'), copies)
+
+
+def validate_member(row):
+    """Return a register_members row tuple, or raise ValueError"""
+    name = required_text(row, 'name')
+    email = optional_text(row, 'email')
+    if email is not None and '@' not in email:
+        raise ValueError(f"invalid email: {email!r}")
+    return (name, email, optional_text(row, 'phone'), optional_text(row, 'address'),
+            required_text(row, 'member_type'))
+
+
+def import_rows(path, validate, add_batch, batch_size=10000, rejects_path=None, max_rejected=100):
+    """Stream path through validate into add_batch(rows) calls of at most batch_size rows"""
+    report = ImportReport(max_rejected)
+    rejects = open(rejects_path, 'w', encoding='utf-8') if rejects_path else None
+    batch = []
+    try:
+        for line_number, row in iter_rows(path):
+            try:
+                if isinstance(row, ValueError):
+                    raise row
+                batch.append(validate(row))
+            except ValueError as e:
+                report.reject(line_number, str(e))
+                if rejects is not None:
+                    rejects.write(json.dumps({'line': line_number, 'reason': str(e),
+                                              'row': row if isinstance(row, dict) else None}) + '\n')
+                continue
+            if len(batch) >= batch_size:
+                add_batch(batch)
+                report.imported += len(batch)
+                batch = []
+        if batch:
+            add_batch(batch)
+            report.imported += len(batch)
+    finally:
+        if rejects is not None:
+            rejects.close()
+    return report
+
+
+def import_books(library, path, batch_size=10000, rejects_path=None, max_rejected=100):
+    """Import books (title, author, isbn, category, copies) from a CSV/JSONL file"""
+    return import_rows(path, validate_book, library.add_books, batch_size, rejects_path, max_rejected)
+
+
+def import_members(library, path, batch_size=10000, rejects_path=None, max_rejected=100):
+    """Import members (name, email, phone, address, member_type) from a CSV/JSONL file"""
+    return import_rows(path, validate_member, library.register_members, batch_size, rejects_path, max_rejected)
+
+
+def main():
+    """Import a books or members file from the command line"""
+    parser = argparse.ArgumentParser(description='Bulk import books or members from CSV/JSONL')
+    parser.add_argument('kind', choices=['books', 'members'], help='What the file contains')
+    parser.add_argument('file', help='.csv file with a header row, or .jsonl file')
+    parser.add_argument('--db', help='SQLite database to import into (default: in memory only)')
+    parser.add_argument('--batch-size', type=int, default=10000, help='Rows per batch (default: 10000)')
+    parser.add_argument('--rejects', help='Write rejected rows to this JSONL file')
+    args = parser.parse_args()
+
+    storage = None
+    if args.db:
+        from library_storage import SQLiteStorage
+        storage = SQLiteStorage(args.db)
+    library = LibraryManagementSystem(storage=storage)
+    importer = import_books if args.kind == 'books' else import_members
+    report = importer(library, args.file, args.batch_size, args.rejects)
+    print(f"Imported {report.imported} {args.kind}, rejected {report.rejected_count}")
+    for line, reason in report.rejected:
+        print(f"  line {line}: {reason}")
+    if storage is not None:
+        storage.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""
+SQLite Storage Backend for the Library Management System
+Persists books, members, loans and overdue fees so a restarted process can
+reload its state. LibraryManagementSystem keeps serving reads from memory and
+writes every change through to this backend when one is passed in.
+"""
+
+import sqlite3
+import datetime
+import threading
+from array import array
+
+from smelly_code import Book, Member, TransactionLog, intern_value
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    author TEXT NOT NULL,
+    isbn TEXT NOT NULL,
+    category TEXT NOT NULL,
+    copies INTEGER NOT NULL,
+    available INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS members (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT,
+    phone TEXT,
+    address TEXT,
+    member_type TEXT,
+    registration_date TEXT
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    member_id INTEGER NOT NULL,
+    isbn TEXT NOT NULL,
+    checkout_date TEXT,
+    due_date TEXT,
+    staff_name TEXT,
+    location TEXT,
+    returned INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS overdue_fees (
+    member_id INTEGER PRIMARY KEY,
+    amount INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS system_stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_books_isbn ON books(isbn);
+CREATE INDEX IF NOT EXISTS idx_transactions_member ON transactions(member_id, returned);
+CREATE INDEX IF NOT EXISTS idx_transactions_isbn ON transactions(isbn);
+"""
+
+# Statements are kept as constants: sqlite3 caches the compiled statement
+# for each distinct SQL string, so every call reuses the prepared statement.
+INSERT_BOOK = "INSERT INTO books (id, title, author, isbn, category, copies, available) VALUES (?, ?, ?, ?, ?, ?, ?)"
+INSERT_MEMBER = ("INSERT INTO members (id, name, email, phone, address, member_type, registration_date) "
+                 "VALUES (?, ?, ?, ?, ?, ?, ?)")
+INSERT_TRANSACTION = ("INSERT INTO transactions (member_id, isbn, checkout_date, due_date, staff_name, location, returned) "
+                      "VALUES (?, ?, ?, ?, ?, ?, ?)")
+UPDATE_AVAILABLE = "UPDATE books SET available = ? WHERE id = ?"
+MARK_RETURNED = "UPDATE transactions SET returned = 1 WHERE id = ?"
+UPSERT_FEE = ("INSERT INTO overdue_fees (member_id, amount) VALUES (?, ?) "
+              "ON CONFLICT(member_id) DO UPDATE SET amount = excluded.amount")
+ADD_STAT = ("INSERT INTO system_stats (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value")
+
+
+def to_text(value):
+    """Store dates as ISO-8601 text"""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+def from_text(value):
+    """Read back an ISO-8601 date stored by to_text"""
+    if value is None:
+        return None
+    return datetime.datetime.fromisoformat(value)
+
+
+class SQLiteStorage:
+    """
+    Write-through SQLite backend using one reused connection in WAL mode.
+    The connection may be shared by threads; each write holds self.lock.
+    """
+
+    def __init__(self, db_path='library.db'):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        # Row ids of in-memory book records, by object id
+        self.row_ids = {}
+        # Row id of each loan, by TransactionLog position (ids may have gaps)
+        self.transaction_ids = array('q')
+
+    def close(self):
+        self.conn.close()
+
+    def load(self):
+        """Return (books, members, transactions, overdue_fees, system_stats) as in-memory records"""
+        books = []
+        for row_id, title, author, isbn, category, copies, available in self.conn.execute(
+                "SELECT id, title, author, isbn, category, copies, available FROM books ORDER BY id"):
+            book = Book(
+                title=title,
+                author=intern_value(author),
+                isbn=isbn,
+                category=intern_value(category),
+                copies=copies,
+                available=available
+            )
+            self.row_ids[id(book)] = row_id
+            books.append(book)
+
+        members = []
+        for member_id, name, email, phone, address, member_type, registration_date in self.conn.execute(
+                "SELECT id, name, email, phone, address, member_type, registration_date FROM members ORDER BY id"):
+            members.append(Member(
+                id=member_id,
+                name=name,
+                email=email,
+                phone=phone,
+                address=address,
+                member_type=intern_value(member_type),
+                borrowed_books=[],
+                registration_date=from_text(registration_date)
+            ))
+        members_by_id = {member['id']: member for member in members}
+
+        transactions = TransactionLog()
+        for row_id, member_id, isbn, checkout_date, due_date, staff_name, location, returned in self.conn.execute(
+                "SELECT id, member_id, isbn, checkout_date, due_date, staff_name, location, returned "
+                "FROM transactions ORDER BY id"):
+            self.transaction_ids.append(row_id)
+            transactions.append({
+                'member_id': member_id,
+                'isbn': isbn,
+                'checkout_date': from_text(checkout_date),
+                'due_date': from_text(due_date),
+                'staff_name': staff_name,
+                'location': location,
+                'returned': bool(returned)
+            })
+            if not returned and member_id in members_by_id:
+                members_by_id[member_id]['borrowed_books'].append(isbn)
+
+        overdue_fees = dict(self.conn.execute("SELECT member_id, amount FROM overdue_fees"))
+        system_stats = dict(self.conn.execute("SELECT name, value FROM system_stats"))
+        return books, members, transactions, overdue_fees, system_stats
+
+    def insert_books(self, books):
+        """Bulk-insert book records in one transaction (single process assumed)"""
+        with self.lock:
+            start = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM books").fetchone()[0]
+            rows = []
+            for row_id, book in enumerate(books, start + 1):
+                self.row_ids[id(book)] = row_id
+                rows.append((row_id, book['title'], book['author'], book['isbn'], book['category'],
+                             book['copies'], book['available']))
+            with self.conn:
+                self.conn.executemany(INSERT_BOOK, rows)
+
+    def insert_members(self, members):
+        """Bulk-insert member records in one transaction"""
+        with self.lock, self.conn:
+            self.conn.executemany(INSERT_MEMBER, [
+                (m['id'], m['name'], m['email'], m['phone'], m['address'], m['member_type'],
+                 to_text(m['registration_date']))
+                for m in members])
+
+    def record_checkout(self, book, transaction):
+        """Insert a loan and the book's new availability atomically"""
+        with self.lock, self.conn:
+            self.conn.execute(UPDATE_AVAILABLE, (book['available'], self.row_ids[id(book)]))
+            cursor = self.conn.execute(INSERT_TRANSACTION, (
+                transaction['member_id'], transaction['isbn'], to_text(transaction['checkout_date']),
+                to_text(transaction['due_date']), transaction['staff_name'], transaction['location'],
+                int(transaction['returned'])))
+            # Concurrent checkouts of different books can arrive out of row order
+            missing = transaction.row + 1 - len(self.transaction_ids)
+            if missing > 0:
+                self.transaction_ids.extend([0] * missing)
+            self.transaction_ids[transaction.row] = cursor.lastrowid
+
+    def record_return(self, book, transaction):
+        """Mark a loan returned and store the book's new availability atomically"""
+        with self.lock, self.conn:
+            self.conn.execute(MARK_RETURNED, (self.transaction_ids[transaction.row],))
+            if book is not None:
+                self.conn.execute(UPDATE_AVAILABLE, (book['available'], self.row_ids[id(book)]))
+
+    def save_overdue_fees(self, fees, overdue_count=0):
+        """Upsert member_id -> total overdue fee pairs and add to the overdue count in one transaction"""
+        with self.lock, self.conn:
+            self.conn.executemany(UPSERT_FEE, list(fees.items()))
+            if overdue_count:
+                self.conn.execute(ADD_STAT, ('overdue_count', overdue_count))
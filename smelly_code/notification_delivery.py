@@ -0,0 +1,223 @@
+"""
+Notification Delivery Pipeline
+Delivers the notifications queued by LibraryManagementSystem.notify without
+making billing wait for them: notify only puts a Delivery on a bounded asyncio
+queue, and a pool of worker tasks sends them in batches through a pluggable
+transport, retrying the deliveries a batch did not get out with exponential
+backoff.
+
+A transport has one coroutine, send_batch(deliveries), returning the
+(sent, rejected) deliveries; rejected ones are never retried, and those in
+neither list were not sent and are retried. Raising OSError means none of
+the batch was sent.
+
+Usage (inside a running event loop):
+    pipeline = DeliveryPipeline(SMTPTransport('localhost', 25, 'library@example.com', address_for))
+    await pipeline.start()
+    library.delivery = pipeline
+    ...
+    await pipeline.stop()
+"""
+
+import asyncio
+import smtplib
+import threading
+from collections import Counter, deque
+from email.message import EmailMessage
+
+from smelly_code import Record
+
+
+class Delivery(Record):
+    """One notification and its delivery status: queued, sent, failed or dropped"""
+    __slots__ = FIELDS = ('member_id', 'message', 'urgent', 'status', 'attempts', 'error')
+
+
+class SMTPTransport:
+    """
+    Sends each batch over one SMTP connection, opened in a worker thread so
+    the event loop is never blocked. At most max_connections batches are in
+    flight at once. address_for(member_id) returns an e-mail address or None.
+    """
+
+    def __init__(self, host, port, sender, address_for, max_connections=4, timeout=10):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.address_for = address_for
+        self.timeout = timeout
+        self.limit = asyncio.Semaphore(max_connections)
+
+    async def send_batch(self, deliveries):
+        """Send a batch; returns (sent, rejected) where rejected failed for good (no address, refused recipient)"""
+        async with self.limit:
+            return await asyncio.to_thread(self._send_batch, deliveries)
+
+    def _send_batch(self, deliveries):
+        sent = []
+        rejected = []
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            for delivery in deliveries:
+                try:
+                    address = self.address_for(delivery['member_id'])
+                    if not address:
+                        delivery['error'] = "no e-mail address"
+                        rejected.append(delivery)
+                        continue
+                    message = self._message(delivery, address)
+                except Exception as e:
+                    # A bad address or header only rejects this delivery
+                    delivery['error'] = f"{type(e).__name__}: {e}"
+                    rejected.append(delivery)
+                    continue
+                try:
+                    smtp.send_message(message)
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError) as e:
+                    delivery['error'] = str(e)
+                    rejected.append(delivery)
+                    continue
+                except OSError as e:
+                    # Connection lost: the rest of the batch is left unsent
+                    for unsent in deliveries[len(sent) + len(rejected):]:
+                        unsent['error'] = str(e)
+                    break
+                sent.append(delivery)
+        finally:
+            try:
+                smtp.quit()
+            except OSError:
+                smtp.close()
+        return sent, rejected
+
+    def _message(self, delivery, address):
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = address
+        message['Subject'] = "URGENT: library notice" if delivery['urgent'] else "Library notice"
+        message.set_content(delivery['message'])
+        return message
+
+
+class DeliveryPipeline:
+    """
+    Bounded queue plus worker tasks delivering notifications in batches.
+    submit() never blocks: when the queue is full, or the pipeline is not
+    running, the delivery is dropped and counted. Recent deliveries are kept in self.deliveries and the totals
+    per status in self.status_counts.
+    """
+
+    def __init__(self, transport, workers=4, batch_size=50, queue_size=10000,
+                 max_attempts=3, backoff=0.1, retention=10000):
+        self.transport = transport
+        self.workers = workers
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.deliveries = deque(maxlen=retention)
+        self.status_counts = Counter()
+        self.queue = None
+        self._loop = None
+        self._loop_thread = None
+        self._tasks = []
+
+    async def start(self):
+        """Create the queue and worker tasks on the running event loop"""
+        self.queue = asyncio.Queue(self.queue_size)
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def join(self):
+        """Wait until every submitted delivery has been sent or has failed"""
+        await self.queue.join()
+
+    async def stop(self):
+        """Finish the queued deliveries, then cancel the workers"""
+        await self.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, member_id, message, urgent=False):
+        """Queue a notification from billing code (any thread); returns its Delivery"""
+        delivery = Delivery(member_id=member_id, message=message, urgent=urgent,
+                            status='queued', attempts=0, error=None)
+        if not self._tasks:
+            # Before start() or after stop() no worker would ever send it
+            delivery['status'] = 'dropped'
+            delivery['error'] = "delivery pipeline is not running"
+            self.deliveries.append(delivery)
+            self.status_counts['dropped'] += 1
+        elif threading.get_ident() == self._loop_thread:
+            self._enqueue(delivery)
+        else:
+            self._loop.call_soon_threadsafe(self._enqueue, delivery)
+        return delivery
+
+    def _enqueue(self, delivery):
+        self.deliveries.append(delivery)
+        try:
+            self.queue.put_nowait(delivery)
+        except asyncio.QueueFull:
+            delivery['status'] = 'dropped'
+        self.status_counts[delivery['status']] += 1
+
+    def _set_status(self, delivery, status):
+        self.status_counts[delivery['status']] -= 1
+        self.status_counts[status] += 1
+        delivery['status'] = status
+
+    async def _worker(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self._deliver(batch)
+            except Exception as e:
+                # Never let one bad batch stop the worker (and stop() with it)
+                for delivery in batch:
+                    if delivery['status'] == 'queued':
+                        delivery['error'] = f"{type(e).__name__}: {e}"
+                        self._set_status(delivery, 'failed')
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _deliver(self, batch):
+        """
+        Send one batch. Deliveries the transport did not get out are retried
+        with exponential backoff; already sent ones are never sent again. Any
+        error other than OSError fails the unsent deliveries without retrying.
+        """
+        unsent = batch
+        for attempt in range(1, self.max_attempts + 1):
+            for delivery in unsent:
+                delivery['attempts'] = attempt
+            try:
+                sent, rejected = await self.transport.send_batch(unsent)
+            except OSError as e:
+                sent, rejected = (), ()
+                for delivery in unsent:
+                    delivery['error'] = str(e)
+            except Exception as e:
+                for delivery in unsent:
+                    delivery['error'] = f"{type(e).__name__}: {e}"
+                    self._set_status(delivery, 'failed')
+                return
+            for delivery in sent:
+                delivery['error'] = None
+                self._set_status(delivery, 'sent')
+            for delivery in rejected:
+                self._set_status(delivery, 'failed')
+            done = {id(delivery) for delivery in sent} | {id(delivery) for delivery in rejected}
+            unsent = [delivery for delivery in unsent if id(delivery) not in done]
+            if not unsent:
+                return
+            if attempt < self.max_attempts:
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+        for delivery in unsent:
+            self._set_status(delivery, 'failed')
@@ -0,0 +1,463 @@
+"""
+Append-Only Operation Log with Snapshots
+Event-sourced storage backend for the Library Management System: every
+add_books, register_members, checkout, return and fee assessment is appended
+to a write-ahead log, and the whole state is periodically written as a
+compact binary snapshot. On restart the latest snapshot is loaded and only
+the log written since it is replayed, so startup time depends on recent
+activity rather than on the total history.
+
+Use it like the SQLite backend: LibraryManagementSystem(storage=OperationLog('state_dir'))
+
+Directory layout:
+    snapshot.bin      header (magic, generation, crc32, length) + marshalled state
+    oplog.<gen>.bin   records (length u32, crc32 u32, marshalled event) written
+                      after the snapshot of the same generation; a crash while
+                      a snapshot is written can leave later generations too
+
+Durability: every record is handed to the OS as it is appended, and the
+writer then blocks until an fsync covers it (group commit). The first
+waiting writer becomes the leader and fsyncs for everyone whose record is
+already written; writers arriving meanwhile wait for the next leader.
+While other writers are on their way, a leader can linger up to
+commit_interval seconds for group_size records to gather (0, the default,
+syncs at once). So when a storage call returns, its event is on disk. A
+torn or corrupt record at the end of the log is cut off on the next load.
+
+Snapshots are taken off the writers' path: the log is switched to the next
+generation under the lock, then the state is written by a background thread
+(or by the snapshot() caller) while writers continue in the new log.
+"""
+
+import os
+import time
+import zlib
+import struct
+import marshal
+import datetime
+import threading
+from array import array
+
+from smelly_code import Book, Member, TransactionLog, EPOCH, encode_datetime, intern_value
+
+
+SNAPSHOT_MAGIC = b'LIBSNAP1'
+SNAPSHOT_HEADER = struct.Struct('<8sIIQ')
+RECORD_HEADER = struct.Struct('<II')
+
+# Event opcodes
+ADD_BOOKS = 'B'
+ADD_MEMBERS = 'M'
+CHECKOUT = 'C'
+RETURN = 'R'
+FEES = 'F'
+
+
+def pack_value(value):
+    """Make a date marshallable: naive datetimes as microseconds, other dates as tagged ISO text"""
+    micros = encode_datetime(value)
+    if micros is not None:
+        return micros
+    if isinstance(value, datetime.datetime):
+        return ('datetime', value.isoformat())
+    if isinstance(value, datetime.date):
+        return ('date', value.isoformat())
+    return value
+
+
+def unpack_date(value):
+    """Inverse of pack_value for date fields"""
+    if type(value) is int:
+        return EPOCH + datetime.timedelta(microseconds=value)
+    if type(value) is tuple:
+        kind, text = value
+        return (datetime.datetime if kind == 'datetime' else datetime.date).fromisoformat(text)
+    return value
+
+
+def dump_transaction_log(log):
+    """Marshallable copy of a TransactionLog's columns, string tables and overflow"""
+    with log.lock:
+        return {
+            'columns': {field: bytes(column) for field, column in log.columns.items()},
+            'strings': {field: list(table.values) for field, table in log.strings.items()},
+            'overflow': [(row, field, pack_value(value)) for (row, field), value in log.overflow.items()]
+        }
+
+
+def load_transaction_log(data):
+    """Rebuild a TransactionLog from dump_transaction_log output"""
+    log = TransactionLog()
+    for field, raw in data['columns'].items():
+        column = log.columns[field]
+        log.columns[field] = bytearray(raw) if isinstance(column, bytearray) else array(column.typecode, raw)
+    for field, values in data['strings'].items():
+        table = log.strings[field]
+        table.values = list(values)
+        table.codes = {value: code for code, value in enumerate(table.values)}
+    for row, field, value in data['overflow']:
+        log.overflow[(row, field)] = unpack_date(value) if field in log.DATE_FIELDS else value
+    return log
+
+
+class OperationLog:
+    """Write-ahead operation log plus snapshots; load() must be called before writing"""
+
+    def __init__(self, directory, group_size=64, commit_interval=0.0, snapshot_every=100000):
+        self.directory = directory
+        self.group_size = group_size
+        self.commit_interval = commit_interval
+        # Events between automatic snapshots; 0 disables them (snapshot() still works)
+        self.snapshot_every = snapshot_every
+        os.makedirs(directory, exist_ok=True)
+        # Guards the log file, the counters below and the state the log owns
+        self.lock = threading.Lock()
+        self.books = []
+        self.members = []
+        self.transactions = TransactionLog()
+        self.overdue_fees = {}
+        self.system_stats = {}
+        # Position of each book record in self.books, by object id
+        self.book_index = {}
+        # Generation of snapshot.bin, and of the log currently appended to
+        self.snapshot_generation = 0
+        self.generation = 0
+        self.log_file = None
+        # Records written so far; then, guarded by self.commit, the writers
+        # between entering _append and writing, the records covered by an
+        # fsync, whether a leader is syncing and the fsync count
+        self.written = 0
+        self.arriving = 0
+        self.synced = 0
+        self.syncing = False
+        self.syncs = 0
+        self.commit = threading.Condition(threading.Lock())
+        self.events_since_snapshot = 0
+        self.snapshot_lock = threading.Lock()
+        self.snapshot_thread = None
+
+    @property
+    def snapshot_path(self):
+        return os.path.join(self.directory, 'snapshot.bin')
+
+    def log_path(self, generation):
+        return os.path.join(self.directory, f'oplog.{generation}.bin')
+
+    # ----- restart -----
+
+    def load(self):
+        """
+        Load the snapshot and replay the logs written after it; returns
+        (books, members, transactions, overdue_fees, system_stats)
+        """
+        self._read_snapshot()
+        self.generation = self.snapshot_generation
+        for name in os.listdir(self.directory):
+            # Logs an interrupted snapshot had not removed yet
+            parts = name.split('.')
+            if len(parts) == 3 and parts[0] == 'oplog' and parts[1].isdigit() and int(parts[1]) < self.generation:
+                os.remove(os.path.join(self.directory, name))
+        paths = [self.log_path(self.generation)]
+        while os.path.exists(self.log_path(self.generation + 1)):
+            self.generation += 1
+            paths.append(self.log_path(self.generation))
+        self._replay(paths)
+        self.book_index = {id(book): index for index, book in enumerate(self.books)}
+        members_by_id = {member['id']: member for member in self.members}
+        for member in self.members:
+            member['borrowed_books'] = []
+        for member_id, isbn, _ in self.transactions.iter_open():
+            member = members_by_id.get(member_id)
+            if member is not None:
+                member['borrowed_books'].append(isbn)
+        self.log_file = open(self.log_path(self.generation), 'ab')
+        return self.books, self.members, self.transactions, dict(self.overdue_fees), dict(self.system_stats)
+
+    def _read_snapshot(self):
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                header = f.read(SNAPSHOT_HEADER.size)
+                payload = f.read()
+        except FileNotFoundError:
+            return
+        magic, generation, checksum, length = SNAPSHOT_HEADER.unpack(header)
+        if magic != SNAPSHOT_MAGIC or length != len(payload) or zlib.crc32(payload) != checksum:
+            raise ValueError(f"{self.snapshot_path} is not a valid library snapshot")
+        state = marshal.loads(payload)
+        self.snapshot_generation = generation
+        self.books = [Book(title=title, author=intern_value(author), isbn=isbn, category=intern_value(category),
+                           copies=copies, available=available)
+                      for title, author, isbn, category, copies, available in zip(*state['books'])]
+        self.members = [self._member(row) for row in state['members']]
+        self.transactions = load_transaction_log(state['transactions'])
+        self.overdue_fees = state['overdue_fees']
+        self.system_stats = state.get('system_stats', {})
+
+    def _member(self, row):
+        member_id, name, email, phone, address, member_type, registration_date = row
+        return Member(id=member_id, name=name, email=email, phone=phone, address=address,
+                      member_type=intern_value(member_type), borrowed_books=[],
+                      registration_date=unpack_date(registration_date))
+
+    def _read_records(self, path):
+        """Yield logged events; cut the file after the last intact record"""
+        good = 0
+        try:
+            f = open(path, 'r+b')
+        except FileNotFoundError:
+            return
+        with f:
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                length, checksum = RECORD_HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != checksum:
+                    break
+                good = f.tell()
+                yield marshal.loads(payload)
+            f.truncate(good)
+
+    def _iter_events(self, paths):
+        for path in paths:
+            yield from self._read_records(path)
+
+    def _replay(self, paths):
+        """
+        Apply the events of the given log files in order. Events may repeat
+        changes already in the snapshot (taken while other threads were
+        mid-operation), so they are applied idempotently: records are skipped
+        when already present and availability/fees carry absolute values.
+        The overdue count is a delta; the snapshot's count is cut exactly at
+        the log switch, so each delta after it is applied once. Checkouts can
+        be logged out of row order by concurrent threads and are placed by row.
+        """
+        members_by_id = {member['id']: member for member in self.members}
+        pending = {}
+        for event in self._iter_events(paths):
+            op = event[0]
+            if op == CHECKOUT:
+                _, row, book_index, available, member_id, isbn, checkout_date, due_date, staff, location = event
+                if 0 <= book_index < len(self.books):
+                    self.books[book_index]['available'] = available
+                if row >= len(self.transactions):
+                    pending[row] = {'member_id': member_id, 'isbn': isbn, 'checkout_date': unpack_date(checkout_date),
+                                    'due_date': unpack_date(due_date), 'staff_name': staff, 'location': location,
+                                    'returned': False}
+                    while len(self.transactions) in pending:
+                        self.transactions.append(pending.pop(len(self.transactions)))
+            elif op == RETURN:
+                _, row, book_index, available = event
+                if row < len(self.transactions):
+                    self.transactions[row]['returned'] = True
+                elif row in pending:
+                    pending[row]['returned'] = True
+                if 0 <= book_index < len(self.books):
+                    self.books[book_index]['available'] = available
+            elif op == FEES:
+                # Logs written before the overdue count was logged have no third field
+                fees, overdue_count = event[1], event[2] if len(event) > 2 else 0
+                self.overdue_fees.update(fees)
+                if overdue_count:
+                    self.system_stats['overdue_count'] = self.system_stats.get('overdue_count', 0) + overdue_count
+            elif op == ADD_BOOKS:
+                _, start, rows = event
+                for index, (title, author, isbn, category, copies, available) in enumerate(rows, start):
+                    if index >= len(self.books):
+                        self.books.append(Book(title=title, author=intern_value(author), isbn=isbn,
+                                               category=intern_value(category), copies=copies, available=available))
+            elif op == ADD_MEMBERS:
+                for row in event[1]:
+                    if row[0] not in members_by_id:
+                        member = members_by_id[row[0]] = self._member(row)
+                        self.members.append(member)
+        # Loans whose predecessor was lost with a torn tail keep their relative order
+        for row in sorted(pending):
+            self.transactions.append(pending[row])
+
+    # ----- writing -----
+
+    def _append(self, event, apply=None):
+        """
+        Log event and return once it is durable. apply(), if given, updates
+        state owned by the log under the same lock as the write.
+        """
+        payload = marshal.dumps(event)
+        with self.commit:
+            self.arriving += 1
+        try:
+            with self.lock:
+                if apply is not None:
+                    apply()
+                sequence = self._write(payload)
+        finally:
+            with self.commit:
+                self.arriving -= 1
+                # A lingering leader may be waiting for this record to fill its group
+                self.commit.notify_all()
+        self._wait_durable(sequence)
+
+    def _write(self, payload):
+        """Write one record through to the OS; the caller holds self.lock. Returns its sequence number"""
+        self.log_file.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self.log_file.flush()
+        self.written += 1
+        self.events_since_snapshot += 1
+        if self.snapshot_every and self.events_since_snapshot >= self.snapshot_every and self.snapshot_thread is None:
+            # Hand the snapshot to a thread so no writer (or its caller's locks) waits for it
+            self.snapshot_thread = threading.Thread(target=self._background_snapshot, name='oplog-snapshot',
+                                                    daemon=True)
+            self.snapshot_thread.start()
+        return self.written
+
+    def _wait_durable(self, sequence):
+        """Block until record `sequence` is fsynced; the first waiter fsyncs for the whole group"""
+        with self.commit:
+            while self.synced < sequence:
+                if self.syncing:
+                    self.commit.wait()
+                    continue
+                self.syncing = True
+                # Linger only while other writers are about to add records; a
+                # writer blocked on its caller's lock would never arrive
+                deadline = time.monotonic() + self.commit_interval
+                while self.arriving and self.written - self.synced < self.group_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.commit.wait(remaining)
+                synced = None
+                self.commit.release()
+                try:
+                    synced = self._fsync()
+                finally:
+                    self.commit.acquire()
+                    self.syncing = False
+                    if synced is not None:
+                        self.synced = max(self.synced, synced)
+                        self.syncs += 1
+                    self.commit.notify_all()
+
+    def _fsync(self):
+        """fsync the log; returns the sequence number of the last record it covers"""
+        with self.lock:
+            sequence = self.written
+            # A duplicate descriptor stays valid if a snapshot switches the log meanwhile
+            descriptor = os.dup(self.log_file.fileno())
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+        return sequence
+
+    def sync(self):
+        """Wait until every logged event is on disk (storage calls already do)"""
+        self._wait_durable(self.written)
+
+    def snapshot(self):
+        """
+        Write a snapshot of the current state and remove the logs it covers.
+        Writers are only held up while the log is switched to a new generation.
+        """
+        with self.snapshot_lock:
+            with self.lock:
+                # Every record logged so far is in the old log, and its change
+                # was made before it was logged, so the state read below
+                # covers it; later records go to the new log.
+                self.log_file.flush()
+                os.fsync(self.log_file.fileno())
+                self.log_file.close()
+                self.generation += 1
+                generation = self.generation
+                self.log_file = open(self.log_path(generation), 'ab')
+                self.events_since_snapshot = 0
+                # The log owns these: copied exactly at the switch
+                overdue_fees = dict(self.overdue_fees)
+                system_stats = dict(self.system_stats)
+                with self.commit:
+                    self.synced = max(self.synced, self.written)
+                    self.syncs += 1
+                    self.commit.notify_all()
+            self._write_snapshot(generation, overdue_fees, system_stats)
+
+    def _background_snapshot(self):
+        try:
+            self.snapshot()
+        finally:
+            with self.lock:
+                self.snapshot_thread = None
+
+    def _write_snapshot(self, generation, overdue_fees, system_stats):
+        books = list(self.books)
+        state = {
+            'books': [tuple(book[field] for book in books) for field in Book.FIELDS],
+            'members': [(m['id'], m['name'], m['email'], m['phone'], m['address'], m['member_type'],
+                         pack_value(m['registration_date'])) for m in list(self.members)],
+            'transactions': dump_transaction_log(self.transactions),
+            'overdue_fees': overdue_fees,
+            'system_stats': system_stats
+        }
+        payload = marshal.dumps(state)
+        temporary = self.snapshot_path + '.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, generation, zlib.crc32(payload), len(payload)))
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.snapshot_path)
+        if hasattr(os, 'O_DIRECTORY'):
+            # Make the rename itself durable before the old logs are removed
+            directory = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+        # The snapshot now covers the logs before this generation
+        for old in range(self.snapshot_generation, generation):
+            if os.path.exists(self.log_path(old)):
+                os.remove(self.log_path(old))
+        self.snapshot_generation = generation
+
+    def close(self):
+        thread = self.snapshot_thread
+        if thread is not None:
+            thread.join()
+        with self.lock:
+            self.log_file.flush()
+            os.fsync(self.log_file.fileno())
+            self.log_file.close()
+
+    # ----- storage backend interface (see library_storage.SQLiteStorage) -----
+
+    def insert_books(self, books):
+        """Log books just appended to the library's book list"""
+        start = len(self.books) - len(books)
+        for index, book in enumerate(books, start):
+            self.book_index[id(book)] = index
+        self._append((ADD_BOOKS, start, [(b['title'], b['author'], b['isbn'], b['category'], b['copies'],
+                                          b['available']) for b in books]))
+
+    def insert_members(self, members):
+        self._append((ADD_MEMBERS, [(m['id'], m['name'], m['email'], m['phone'], m['address'], m['member_type'],
+                                     pack_value(m['registration_date'])) for m in members]))
+
+    def record_checkout(self, book, transaction):
+        self._append((CHECKOUT, transaction.row, self.book_index.get(id(book), -1), book['available'],
+                      transaction['member_id'], transaction['isbn'], pack_value(transaction['checkout_date']),
+                      pack_value(transaction['due_date']), transaction['staff_name'], transaction['location']))
+
+    def record_return(self, book, transaction):
+        if book is None:
+            self._append((RETURN, transaction.row, -1, 0))
+        else:
+            self._append((RETURN, transaction.row, self.book_index.get(id(book), -1), book['available']))
+
+    def save_overdue_fees(self, fees, overdue_count=0):
+        """Log member_id -> total overdue fee pairs and the number of newly overdue loans"""
+        def apply():
+            # Applied together with the write, so a snapshot's copy matches its log switch exactly
+            self.overdue_fees.update(fees)
+            if overdue_count:
+                self.system_stats['overdue_count'] = self.system_stats.get('overdue_count', 0) + overdue_count
+        self._append((FEES, list(fees.items()), overdue_count), apply)
@@ -6,6 +6,321 @@ This code intentionally contains 6 code smells for educational purposes.
 
 import datetime
 import random
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from collections import deque
+from itertools import islice
+
+
+def calculate_overdue_fee(days_overdue):
+    """Tiered overdue fee for one loan: 5/10/15/20 per day after 0/7/14/30 days"""
+    # Magic Numbers Smell: Hard-coded values without explanation
+    if days_overdue <= 7:
+        return days_overdue * 5
+    elif days_overdue <= 14:
+        return 35 + (days_overdue - 7) * 10
+    elif days_overdue <= 30:
+        return 105 + (days_overdue - 14) * 15
+    else:
+        return 345 + (days_overdue - 30) * 20
+
+
+def intern_value(value):
+    """Share one string object between records repeating the same value"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Record:
+    """
+    Compact record base class that still supports the dict-style access
+    (record['field'], 'field' in record, .get, .keys, .items) used by callers
+    written against the original dict records. Subclasses list their FIELDS.
+    """
+    
+    __slots__ = ()
+    FIELDS = ()
+    
+    def __init__(self, **fields):
+        for name in self.FIELDS:
+            setattr(self, name, fields[name])
+    
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+    
+    def __contains__(self, key):
+        return key in self.FIELDS
+    
+    def __len__(self):
+        return len(self.FIELDS)
+    
+    def __iter__(self):
+        return iter(self.FIELDS)
+    
+    def __eq__(self, other):
+        if isinstance(other, (Record, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+    
+    __hash__ = object.__hash__
+    
+    def get(self, key, default=None):
+        return self[key] if key in self.FIELDS else default
+    
+    def keys(self):
+        return list(self.FIELDS)
+    
+    def items(self):
+        return [(name, self[name]) for name in self.FIELDS]
+    
+    def to_dict(self):
+        return dict(self.items())
+    
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Book(Record):
+    __slots__ = FIELDS = ('title', 'author', 'isbn', 'category', 'copies', 'available')
+
+
+class Member(Record):
+    __slots__ = FIELDS = ('id', 'name', 'email', 'phone', 'address', 'member_type', 'borrowed_books', 'registration_date')
+
+
+class Transaction(Record):
+    """
+    Dict-style view of one row of a TransactionLog. Views are created on
+    access; two views of the same row read and write the same data.
+    """
+    
+    __slots__ = ('log', 'row')
+    FIELDS = ('member_id', 'isbn', 'checkout_date', 'due_date', 'staff_name', 'location', 'returned')
+    
+    def __init__(self, log, row):
+        self.log = log
+        self.row = row
+    
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return self.log.get_value(self.row, key)
+    
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        self.log.set_value(self.row, key, value)
+    
+    def __eq__(self, other):
+        if isinstance(other, Transaction) and other.log is self.log:
+            return other.row == self.row
+        return super().__eq__(other)
+    
+    def __hash__(self):
+        return hash((id(self.log), self.row))
+
+
+class StringTable:
+    """Dictionary encoding for a repeated value: each distinct value is stored once"""
+    
+    __slots__ = ('values', 'codes')
+    
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+    
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+EPOCH = datetime.datetime(1970, 1, 1)
+OVERFLOW = -2 ** 63
+
+
+def encode_datetime(value):
+    """Naive datetime -> microseconds since 1970, or None if it cannot be packed"""
+    if type(value) is not datetime.datetime or value.tzinfo is not None:
+        return None
+    delta = value - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+class TransactionLog:
+    """
+    Struct-of-arrays store for loans: one typed array per field, with ISBN,
+    staff name and location dictionary-encoded. Values that do not fit their
+    column (e.g. timezone-aware dates) are kept in a small overflow dict.
+    Indexing returns Transaction views, so existing dict-style code works.
+    Appends are serialized by a lock so concurrent checkouts get distinct rows.
+    """
+    
+    STRING_FIELDS = ('isbn', 'staff_name', 'location')
+    DATE_FIELDS = ('checkout_date', 'due_date')
+    
+    def __init__(self):
+        self.columns = {
+            'member_id': array('q'),
+            'isbn': array('I'),
+            'checkout_date': array('q'),
+            'due_date': array('q'),
+            'staff_name': array('I'),
+            'location': array('I'),
+            'returned': bytearray()
+        }
+        self.strings = {field: StringTable() for field in self.STRING_FIELDS}
+        self.overflow = {}
+        self.lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self.columns['returned'])
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Transaction(self, row) for row in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("transaction index out of range")
+        return Transaction(self, index)
+    
+    def __iter__(self):
+        for row in range(len(self)):
+            yield Transaction(self, row)
+    
+    def iter_open(self):
+        """Yield (member_id, isbn, view) for every loan not yet returned, reading the columns directly"""
+        returned = self.columns['returned']
+        member_ids = self.columns['member_id']
+        isbn_codes = self.columns['isbn']
+        isbns = self.strings['isbn'].values
+        for row in range(len(returned)):
+            if not returned[row]:
+                member_id = member_ids[row]
+                if member_id == OVERFLOW:
+                    member_id = self.get_value(row, 'member_id')
+                yield member_id, isbns[isbn_codes[row]], Transaction(self, row)
+    
+    def append(self, fields):
+        """Append a loan given as a mapping of the Transaction fields; returns its view"""
+        with self.lock:
+            row = len(self)
+            for field, column in self.columns.items():
+                column.append(0)
+                self.set_value(row, field, fields[field])
+        return Transaction(self, row)
+    
+    def get_value(self, row, field):
+        raw = self.columns[field][row]
+        if field in self.strings:
+            return self.strings[field].values[raw]
+        if field == 'returned':
+            return bool(raw)
+        if raw == OVERFLOW and (row, field) in self.overflow:
+            return self.overflow[(row, field)]
+        if field in self.DATE_FIELDS:
+            return EPOCH + datetime.timedelta(microseconds=raw)
+        return raw
+    
+    def set_value(self, row, field, value):
+        self.overflow.pop((row, field), None)
+        if field in self.strings:
+            self.columns[field][row] = self.strings[field].encode(value)
+            return
+        if field == 'returned':
+            self.columns[field][row] = 1 if value else 0
+            return
+        if field in self.DATE_FIELDS:
+            packed = encode_datetime(value)
+        else:
+            packed = value if type(value) is int and OVERFLOW < value < 2 ** 63 else None
+        if packed is None:
+            self.overflow[(row, field)] = value
+            packed = OVERFLOW
+        self.columns[field][row] = packed
+
+
+class NotificationQueue:
+    """
+    Bounded notification queues for one member: a regular channel and a
+    separate priority channel for urgent notices, each keeping only the most
+    recent `retention` messages, plus an O(1) count of everything sent.
+    """
+    
+    __slots__ = ('regular', 'urgent', 'sent')
+    
+    def __init__(self, retention):
+        self.regular = deque(maxlen=retention)
+        self.urgent = deque(maxlen=retention)
+        self.sent = 0
+    
+    def push(self, message, urgent=False):
+        (self.urgent if urgent else self.regular).append(message)
+        self.sent += 1
+
+
+class TextIndex:
+    """
+    Case-folded inverted index from one book field to book records, with
+    exact, prefix and token lookups. Lists keep books in insertion order.
+    New keys are appended to sorted_keys and sorted on the next prefix
+    lookup; the sorted prefix is one run to Timsort, so that costs
+    O(n + k log k) for k new keys, and bulk loads stay linear.
+    """
+    
+    def __init__(self):
+        self.exact = {}
+        self.tokens = {}
+        self.sorted_keys = []
+        self._unsorted = False
+    
+    def add(self, value, book):
+        key = value.casefold()
+        if key not in self.exact:
+            self.exact[key] = []
+            self.sorted_keys.append(key)
+            self._unsorted = True
+        self.exact[key].append(book)
+        for token in set(key.split()):
+            self.tokens.setdefault(token, []).append(book)
+    
+    def find_exact(self, query):
+        """Books whose field equals query, ignoring case"""
+        return iter(self.exact.get(query.casefold(), []))
+    
+    def find_prefix(self, query):
+        """Books whose field starts with query, ignoring case, grouped by field value"""
+        if self._unsorted:
+            self.sorted_keys.sort()
+            self._unsorted = False
+        prefix = query.casefold()
+        keys = self.sorted_keys
+        i = bisect_left(keys, prefix)
+        while i < len(keys) and keys[i].startswith(prefix):
+            yield from self.exact[keys[i]]
+            i += 1
+    
+    def find_tokens(self, query):
+        """Books whose field contains every word of query, ignoring case"""
+        postings = [self.tokens.get(token, []) for token in set(query.casefold().split())]
+        if not postings:
+            return
+        postings.sort(key=len)
+        others = [{id(book) for book in books} for books in postings[1:]]
+        for book in postings[0]:
+            if all(id(book) in ids for ids in others):
+                yield book
 
 
 class LibraryManagementSystem:
@@ -15,81 +330,224 @@ class LibraryManagementSystem:
     Lines: 15-180
     """
     
-    def __init__(self):
+    def __init__(self, notification_retention=100, notification_log_size=10000, storage=None,
+                 lock_stripes=64):
         self.books = []
         self.members = []
-        self.transactions = []
+        self.transactions = TransactionLog()
         self.overdue_fees = {}
         self.book_categories = {}
         self.member_types = {}
-        self.notifications = []
+        # Recent notifications of all members; per-member history is in member_notifications
+        self.notifications = deque(maxlen=notification_log_size)
+        self.member_notifications = {}
+        self.notification_retention = notification_retention
         self.system_stats = {}
+        # Lookup indexes kept in step with self.books / self.members
+        self.books_by_isbn = {}
+        self.members_by_id = {}
+        self.open_transactions = {}
+        self.author_index = TextIndex()
+        self.category_index = TextIndex()
+        # Optional persistent backend (e.g. library_storage.SQLiteStorage); None keeps everything in memory
+        self.storage = storage
+        # Optional delivery pipeline (e.g. notification_delivery.DeliveryPipeline); notify hands it
+        # every notification without waiting for delivery
+        self.delivery = None
+        # Striped locks: checkouts/returns of one ISBN are serialized, different
+        # ISBNs mostly proceed in parallel. Lock order: ISBN, then member, then
+        # the transaction log's own lock.
+        self.isbn_locks = [threading.Lock() for _ in range(lock_stripes)]
+        self.member_locks = [threading.Lock() for _ in range(lock_stripes)]
+        # Serializes adding books/members (member ids come from len(self.members))
+        self.catalog_lock = threading.Lock()
+        if storage is not None:
+            self.load_from_storage()
+    
+    def isbn_lock(self, isbn):
+        """The lock guarding availability of every copy of isbn"""
+        return self.isbn_locks[hash(isbn) % len(self.isbn_locks)]
+    
+    def member_lock(self, member_id):
+        """The lock guarding a member's borrowed_books, open loans and fees"""
+        return self.member_locks[hash(member_id) % len(self.member_locks)]
+    
+    def load_from_storage(self):
+        """Replace the in-memory state with the contents of self.storage"""
+        self.books, self.members, self.transactions, self.overdue_fees, self.system_stats = self.storage.load()
+        self.book_categories = {}
+        for book in self.books:
+            self.book_categories.setdefault(book['category'], []).append(book)
+        self.member_types = {member['id']: member['member_type'] for member in self.members}
+        self.rebuild_indexes()
+    
+    def notify(self, member_id, message, urgent=False):
+        """Queue a notification for a member (urgent ones on the priority channel)"""
+        queue = self.member_notifications.get(member_id)
+        if queue is None:
+            queue = self.member_notifications[member_id] = NotificationQueue(self.notification_retention)
+        queue.push(message, urgent)
+        self.notifications.append(message)
+        if self.delivery is not None:
+            self.delivery.submit(member_id, message, urgent)
+    
+    def get_member_notifications(self, member_id, urgent=False):
+        """Return a member's retained notifications from one channel, oldest first"""
+        queue = self.member_notifications.get(member_id)
+        if queue is None:
+            return []
+        return list(queue.urgent if urgent else queue.regular)
+    
+    def count_notifications_sent(self, member_id):
+        """Number of notifications ever sent to a member, in O(1)"""
+        queue = self.member_notifications.get(member_id)
+        return queue.sent if queue else 0
+    
+    def rebuild_indexes(self):
+        """Rebuild the lookup indexes after self.books or self.members were changed directly"""
+        self.books_by_isbn = {}
+        self.author_index = TextIndex()
+        self.category_index = TextIndex()
+        for book in self.books:
+            self.books_by_isbn.setdefault(book['isbn'], []).append(book)
+            self.author_index.add(book['author'], book)
+            self.category_index.add(book['category'], book)
+        self.members_by_id = {member['id']: member for member in self.members}
+        self.open_transactions = {}
+        for member_id, _, transaction in self.transactions.iter_open():
+            self.open_transactions.setdefault(member_id, []).append(transaction)
         
     def add_book(self, title, author, isbn, category, copies):
         """Add a new book to the library"""
-        book = {
-            'title': title,
-            'author': author,
-            'isbn': isbn,
-            'category': category,
-            'copies': copies,
-            'available': copies
-        }
+        self.add_books([(title, author, isbn, category, copies)])
+    
+    def add_books(self, rows):
+        """Add many (title, author, isbn, category, copies) rows; stored in one batch"""
+        books = []
+        by_category = {}
+        with self.catalog_lock:
+            for title, author, isbn, category, copies in rows:
+                book = self._add_book_record(title, author, isbn, category, copies)
+                books.append(book)
+                by_category.setdefault(book['category'], []).append(book)
+            # One extend per category in the batch instead of one lookup per book
+            for category, category_books in by_category.items():
+                self.book_categories.setdefault(category, []).extend(category_books)
+            if self.storage is not None:
+                self.storage.insert_books(books)
+        return books
+    
+    def _add_book_record(self, title, author, isbn, category, copies):
+        """Create a book and index it; add_books files it under its category"""
+        book = Book(
+            title=title,
+            author=intern_value(author),
+            isbn=isbn,
+            category=intern_value(category),
+            copies=copies,
+            available=copies
+        )
         self.books.append(book)
-        if category not in self.book_categories:
-            self.book_categories[category] = []
-        self.book_categories[category].append(book)
+        self.books_by_isbn.setdefault(isbn, []).append(book)
+        self.author_index.add(author, book)
+        self.category_index.add(category, book)
+        return book
     
     def register_member(self, name, email, phone, address, member_type):
         """Register a new member"""
-        member = {
-            'id': len(self.members) + 1,
-            'name': name,
-            'email': email,
-            'phone': phone,
-            'address': address,
-            'member_type': member_type,
-            'borrowed_books': [],
-            'registration_date': datetime.datetime.now()
-        }
+        self.register_members([(name, email, phone, address, member_type)])
+    
+    def register_members(self, rows):
+        """Register many (name, email, phone, address, member_type) rows; stored in one batch"""
+        registration_date = datetime.datetime.now()
+        members = []
+        with self.catalog_lock:
+            for name, email, phone, address, member_type in rows:
+                members.append(self._add_member_record(name, email, phone, address, member_type, registration_date))
+            self.member_types.update((member['id'], member['member_type']) for member in members)
+            if self.storage is not None:
+                self.storage.insert_members(members)
+        return members
+    
+    def _add_member_record(self, name, email, phone, address, member_type, registration_date):
+        member = Member(
+            id=len(self.members) + 1,
+            name=name,
+            email=email,
+            phone=phone,
+            address=address,
+            member_type=intern_value(member_type),
+            borrowed_books=[],
+            registration_date=registration_date
+        )
         self.members.append(member)
-        self.member_types[member['id']] = member_type
+        self.members_by_id[member['id']] = member
+        return member
     
     def process_book_checkout(self, member_id, isbn, checkout_date, due_date, staff_name, location):
         """
         Large Parameter List Smell: This method takes too many parameters (6).
         Lines: 65-95
         """
-        book = None
-        for b in self.books:
-            if b['isbn'] == isbn and b['available'] > 0:
-                book = b
-                break
-        
-        if not book:
-            return False
-        
-        member = None
-        for m in self.members:
-            if m['id'] == member_id:
-                member = m
-                break
-        
-        if not member:
-            return False
-        
-        book['available'] -= 1
-        transaction = {
-            'member_id': member_id,
-            'isbn': isbn,
-            'checkout_date': checkout_date,
-            'due_date': due_date,
-            'staff_name': staff_name,
-            'location': location,
-            'returned': False
-        }
-        self.transactions.append(transaction)
-        member['borrowed_books'].append(isbn)
+        with self.isbn_lock(isbn):
+            book = None
+            for b in self.books_by_isbn.get(isbn, []):
+                if b['available'] > 0:
+                    book = b
+                    break
+            
+            if not book:
+                return False
+            
+            member = self.members_by_id.get(member_id)
+            
+            if not member:
+                return False
+            
+            with self.member_lock(member_id):
+                book['available'] -= 1
+                transaction = self.transactions.append({
+                    'member_id': member_id,
+                    'isbn': book['isbn'],
+                    'checkout_date': checkout_date,
+                    'due_date': due_date,
+                    'staff_name': staff_name,
+                    'location': location,
+                    'returned': False
+                })
+                self.open_transactions.setdefault(member_id, []).append(transaction)
+                member['borrowed_books'].append(book['isbn'])
+            if self.storage is not None:
+                self.storage.record_checkout(book, transaction)
+        return True
+    
+    def process_book_return(self, member_id, isbn):
+        """Return the member's oldest open loan of isbn; False if there is none"""
+        with self.isbn_lock(isbn):
+            with self.member_lock(member_id):
+                open_loans = self.open_transactions.get(member_id, [])
+                for i, transaction in enumerate(open_loans):
+                    if transaction['isbn'] == isbn and not transaction['returned']:
+                        break
+                else:
+                    return False
+                
+                transaction['returned'] = True
+                del open_loans[i]
+                if not open_loans:
+                    del self.open_transactions[member_id]
+                
+                member = self.members_by_id.get(member_id)
+                if member and isbn in member['borrowed_books']:
+                    member['borrowed_books'].remove(isbn)
+            returned_book = None
+            for book in self.books_by_isbn.get(isbn, []):
+                if book['available'] < book['copies']:
+                    book['available'] += 1
+                    returned_book = book
+                    break
+            if self.storage is not None:
+                self.storage.record_return(returned_book, transaction)
         return True
     
     def calculate_and_process_overdue_fees_with_notifications_and_updates(self, member_id, return_date):
@@ -97,11 +555,7 @@ class LibraryManagementSystem:
         Long Method Smell: This method is too long (>50 lines) and does too much.
         Lines: 99-160
         """
-        member = None
-        for m in self.members:
-            if m['id'] == member_id:
-                member = m
-                break
+        member = self.members_by_id.get(member_id)
         
         if not member:
             return None
@@ -109,21 +563,12 @@ class LibraryManagementSystem:
         total_fee = 0
         overdue_books = []
         
-        for transaction in self.transactions:
-            if transaction['member_id'] == member_id and not transaction['returned']:
+        for transaction in self.open_transactions.get(member_id, []):
+            if not transaction['returned']:
                 days_overdue = (return_date - transaction['due_date']).days
                 
                 if days_overdue > 0:
-                    # Magic Numbers Smell: Hard-coded values without explanation
-                    # Lines: 119-135
-                    if days_overdue <= 7:
-                        fee = days_overdue * 5
-                    elif days_overdue <= 14:
-                        fee = 35 + (days_overdue - 7) * 10
-                    elif days_overdue <= 30:
-                        fee = 105 + (days_overdue - 14) * 15
-                    else:
-                        fee = 345 + (days_overdue - 30) * 20
+                    fee = calculate_overdue_fee(days_overdue)
                     
                     total_fee += fee
                     overdue_books.append({
@@ -137,86 +582,173 @@ class LibraryManagementSystem:
                     self.overdue_fees[member_id] += fee
                     
                     notification = f"Member {member['name']} has overdue book {transaction['isbn']} - Fee: ${fee}"
-                    self.notifications.append(notification)
+                    self.notify(member_id, notification)
                     
                     if days_overdue > 30:
                         urgent_notification = f"URGENT: Member {member['name']} is {days_overdue} days overdue!"
-                        self.notifications.append(urgent_notification)
+                        self.notify(member_id, urgent_notification, urgent=True)
         
         if 'overdue_count' not in self.system_stats:
             self.system_stats['overdue_count'] = 0
         self.system_stats['overdue_count'] += len(overdue_books)
         
+        if self.storage is not None and overdue_books:
+            self.storage.save_overdue_fees({member_id: self.overdue_fees[member_id]}, len(overdue_books))
+        
         return {
             'member_id': member_id,
             'total_fee': total_fee,
             'overdue_books': overdue_books,
-            'notifications_sent': len([n for n in self.notifications if str(member_id) in n])
+            'notifications_sent': self.count_notifications_sent(member_id)
         }
     
+    def process_overdue_fees_for_all_members(self, return_date):
+        """
+        Batch billing: one pass over the open loans of every member, with the
+        same fee schedule and notifications as the per-member method.
+        overdue_fees and system_stats are updated once at the end.
+        Returns member_id -> result for members with overdue books.
+        """
+        results = {}
+        fee_totals = {}
+        overdue_count = 0
+        
+        # Snapshot: concurrent checkouts may add members to open_transactions
+        for member_id, open_loans in list(self.open_transactions.items()):
+            member = self.members_by_id.get(member_id)
+            if not member:
+                continue
+            
+            for transaction in open_loans:
+                days_overdue = (return_date - transaction['due_date']).days
+                if transaction['returned'] or days_overdue <= 0:
+                    continue
+                
+                fee = calculate_overdue_fee(days_overdue)
+                result = results.get(member_id)
+                if result is None:
+                    result = results[member_id] = {
+                        'member_id': member_id,
+                        'total_fee': 0,
+                        'overdue_books': [],
+                        'notifications_sent': 0
+                    }
+                result['total_fee'] += fee
+                result['overdue_books'].append({
+                    'isbn': transaction['isbn'],
+                    'days': days_overdue,
+                    'fee': fee
+                })
+                fee_totals[member_id] = fee_totals.get(member_id, 0) + fee
+                overdue_count += 1
+                
+                self.notify(member_id, f"Member {member['name']} has overdue book {transaction['isbn']} - Fee: ${fee}")
+                if days_overdue > 30:
+                    self.notify(member_id, f"URGENT: Member {member['name']} is {days_overdue} days overdue!", urgent=True)
+                result['notifications_sent'] = self.count_notifications_sent(member_id)
+        
+        for member_id, fee in fee_totals.items():
+            self.overdue_fees[member_id] = self.overdue_fees.get(member_id, 0) + fee
+        if self.storage is not None:
+            self.storage.save_overdue_fees({member_id: self.overdue_fees[member_id] for member_id in fee_totals},
+                                           overdue_count)
+        self.system_stats['overdue_count'] = self.system_stats.get('overdue_count', 0) + overdue_count
+        return results
+    
     def generate_member_report(self, member_id):
         """
         Feature Envy Smell: This method uses member data more than its own class data.
         Lines: 164-180
         """
-        member = None
-        for m in self.members:
-            if m['id'] == member_id:
-                member = m
-                break
+        member = self.members_by_id.get(member_id)
         
         if not member:
             return None
         
-        report = f"Member Report for {member['name']}\n"
-        report += f"Email: {member['email']}\n"
-        report += f"Phone: {member['phone']}\n"
-        report += f"Address: {member['address']}\n"
-        report += f"Member Type: {member['member_type']}\n"
-        report += f"Books Borrowed: {len(member['borrowed_books'])}\n"
-        report += f"Registration Date: {member['registration_date']}\n"
-        
-        return report
+        return format_member_report(member)
+    
+    def iter_member_reports(self, member_type=None):
+        """
+        Lazily yield the report of every member (or of every member of one
+        member_type) in registration order, in one pass over the members.
+        """
+        for member in self.members:
+            if member_type is None or member['member_type'] == member_type:
+                yield format_member_report(member)
+    
+    def write_member_reports(self, out, member_type=None):
+        """Stream member reports to a writer (e.g. an open file); returns how many were written"""
+        count = 0
+        for report in self.iter_member_reports(member_type):
+            out.write(report)
+            count += 1
+        return count
 
 
-def search_books_by_author(library, author_name):
+MEMBER_REPORT_TEMPLATE = (
+    "Member Report for {name}\n"
+    "Email: {email}\n"
+    "Phone: {phone}\n"
+    "Address: {address}\n"
+    "Member Type: {member_type}\n"
+    "Books Borrowed: {borrowed}\n"
+    "Registration Date: {registration_date}\n"
+)
+
+
+def format_member_report(member):
+    """Format one member's report with a single template fill"""
+    return MEMBER_REPORT_TEMPLATE.format(
+        name=member['name'],
+        email=member['email'],
+        phone=member['phone'],
+        address=member['address'],
+        member_type=member['member_type'],
+        borrowed=len(member['borrowed_books']),
+        registration_date=member['registration_date']
+    )
+
+
+def format_book(book):
+    """Format a book as a search result line"""
+    return f"{book['title']} by {book['author']} (ISBN: {book['isbn']})"
+
+
+def search_books(library, field, query, mode='exact', offset=0, limit=None):
     """
-    Duplicated Code Smell: Similar logic appears in multiple places.
-    Lines: 186-200
+    Lazily yield formatted results for an 'author' or 'category' search.
+    mode is 'exact', 'prefix' or 'token'; offset/limit select a page, and
+    only the books on that page are formatted. Raises ValueError for any
+    other field or mode.
     """
-    results = []
-    for book in library.books:
-        if book['author'].lower() == author_name.lower():
-            results.append(book)
-    
-    if len(results) == 0:
-        return None
-    
-    formatted_results = []
-    for book in results:
-        formatted_results.append(f"{book['title']} by {book['author']} (ISBN: {book['isbn']})")
-    
-    return formatted_results
+    if field == 'author':
+        index = library.author_index
+    elif field == 'category':
+        index = library.category_index
+    else:
+        raise ValueError(f"cannot search books by {field!r}")
+    if mode == 'exact':
+        books = index.find_exact(query)
+    elif mode == 'prefix':
+        books = index.find_prefix(query)
+    elif mode == 'token':
+        books = index.find_tokens(query)
+    else:
+        raise ValueError(f"unknown search mode {mode!r}")
+    stop = None if limit is None else offset + limit
+    return (format_book(book) for book in islice(books, offset, stop))
+
+
+def search_books_by_author(library, author_name):
+    """Return formatted books by an author (any case), or None if there are none"""
+    results = list(search_books(library, 'author', author_name))
+    return results or None
 
 
 def search_books_by_category(library, category_name):
-    """
-    Duplicated Code Smell: Nearly identical to search_books_by_author.
-    Lines: 204-218
-    """
-    results = []
-    for book in library.books:
-        if book['category'].lower() == category_name.lower():
-            results.append(book)
-    
-    if len(results) == 0:
-        return None
-    
-    formatted_results = []
-    for book in results:
-        formatted_results.append(f"{book['title']} by {book['author']} (ISBN: {book['isbn']})")
-    
-    return formatted_results
+    """Return formatted books in a category (any case), or None if there are none"""
+    results = list(search_books(library, 'category', category_name))
+    return results or None
 
 
 def main():
@@ -6,13 +6,97 @@ This demonstrates that smelly code can still be functionally correct.
 """
 
 import unittest
+import asyncio
 import datetime
+import io
+import os
+import random
 import sys
+import tempfile
+import threading
+import time
 from smelly_code import (
     LibraryManagementSystem, 
+    Member,
+    TransactionLog,
+    calculate_overdue_fee,
+    search_books,
     search_books_by_author, 
     search_books_by_category
 )
+from library_storage import SQLiteStorage
+from notification_delivery import DeliveryPipeline, SMTPTransport
+from bulk_import import import_books, import_members
+from operation_log import OperationLog
+
+try:
+    import fee_engine
+except ImportError:
+    fee_engine = None
+
+
+async def start_smtp_stand_in(received):
+    """Minimal local SMTP server for tests; appends each message body to received"""
+    async def handle(reader, writer):
+        writer.write(b"220 stand-in ready\r\n")
+        data = None
+        while line := await reader.readline():
+            if data is not None:
+                if line == b".\r\n":
+                    received.append(b"".join(data).decode())
+                    data = None
+                    writer.write(b"250 queued\r\n")
+                else:
+                    data.append(line)
+                continue
+            command = line[:4].upper()
+            if command == b"DATA":
+                data = []
+                writer.write(b"354 end with .\r\n")
+            elif command == b"QUIT":
+                writer.write(b"221 bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"250 ok\r\n")
+            await writer.drain()
+        writer.close()
+    return await asyncio.start_server(handle, '127.0.0.1', 0)
+
+
+class FlakyTransport:
+    """
+    Transport failing its first `failures` batches with a connection error,
+    after getting the first `partial` deliveries of each failing batch out.
+    """
+    
+    def __init__(self, failures, partial=0):
+        self.failures = failures
+        self.partial = partial
+        self.sent = []
+    
+    async def send_batch(self, deliveries):
+        if self.failures > 0:
+            self.failures -= 1
+            if not self.partial:
+                raise ConnectionError("transport unavailable")
+            self.sent.extend(deliveries[:self.partial])
+            return deliveries[:self.partial], []
+        self.sent.extend(deliveries)
+        return deliveries, []
+
+
+class BrokenTransport:
+    """Transport whose first batch fails with a programming error"""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    async def send_batch(self, deliveries):
+        self.calls += 1
+        if self.calls == 1:
+            raise KeyError(deliveries[0]['member_id'])
+        return deliveries, []
 
 
 class TestLibraryManagementSystem(unittest.TestCase):
@@ -265,6 +349,656 @@ class TestLibraryManagementSystem(unittest.TestCase):
         self.assertIn("Member Report for", report, "Report should have proper header")
         self.assertIn("Books Borrowed:", report, "Report should show borrowed books count")
 
+    
+    def test_lookup_indexes_track_books_and_members(self):
+        """
+        Test that the ISBN and member-id indexes stay consistent with the lists.
+        Verifies add_book, register_member and rebuild_indexes.
+        """
+        self.library.add_book("Indexed Book", "Index Author", "978-1212121212", "Reference", 1)
+        self.library.register_member("Indexed User", "idx@email.com", "555-1212", "12 Index St", "Student")
+        
+        # Verify indexes point at the same records as the lists
+        self.assertIs(self.library.books_by_isbn["978-1212121212"][0], self.library.books[0])
+        self.assertIs(self.library.members_by_id[1], self.library.members[0])
+        
+        # Verify rebuilding picks up records appended directly to the lists
+        self.library.members.append({'id': 2, 'name': "Direct User"})
+        self.library.rebuild_indexes()
+        self.assertEqual(self.library.members_by_id[2]['name'], "Direct User")
+        self.assertEqual(len(self.library.books_by_isbn["978-1212121212"]), 1)
+    
+    def test_checkout_duplicate_isbn_uses_first_available_copy(self):
+        """
+        Test checkout when the same ISBN was added twice.
+        Verifies the first entry with copies available is used, as before indexing.
+        """
+        self.library.add_book("Dup Book", "Dup Author", "978-1313131313", "Drama", 1)
+        self.library.add_book("Dup Book", "Dup Author", "978-1313131313", "Drama", 1)
+        self.library.register_member("Dup User", "dup@email.com", "555-1313", "13 Dup St", "Regular")
+        
+        now = datetime.datetime.now()
+        self.assertTrue(self.library.process_book_checkout(1, "978-1313131313", now, now, "Staff D", "Desk 4"))
+        self.assertTrue(self.library.process_book_checkout(1, "978-1313131313", now, now, "Staff D", "Desk 4"))
+        self.assertFalse(self.library.process_book_checkout(1, "978-1313131313", now, now, "Staff D", "Desk 4"))
+        
+        # Verify both copies were used, first entry first
+        self.assertEqual(self.library.books[0]['available'], 0)
+        self.assertEqual(self.library.books[1]['available'], 0)
+        
+        # Verify unknown members are still rejected
+        self.library.add_book("Other Book", "Other Author", "978-1414141414", "Drama", 1)
+        self.assertFalse(self.library.process_book_checkout(99, "978-1414141414", now, now, "Staff D", "Desk 4"))
+
+    
+    def test_return_book_closes_open_loan(self):
+        """
+        Test that returning a book updates availability and the open-loan index.
+        Verifies returned loans no longer accrue overdue fees.
+        """
+        self.library.add_book("Return Book", "Author R", "978-1515151515", "History", 1)
+        self.library.register_member("Return User", "ret@email.com", "555-1515", "15 Return St", "Regular")
+        
+        due_date = datetime.datetime.now() - datetime.timedelta(days=10)
+        self.library.process_book_checkout(1, "978-1515151515", due_date, due_date, "Staff E", "Desk 5")
+        self.assertEqual(len(self.library.open_transactions[1]), 1)
+        
+        # Verify return succeeds once
+        self.assertTrue(self.library.process_book_return(1, "978-1515151515"))
+        self.assertFalse(self.library.process_book_return(1, "978-1515151515"))
+        
+        # Verify book, member and transaction state
+        self.assertEqual(self.library.books[0]['available'], 1)
+        self.assertEqual(self.library.members[0]['borrowed_books'], [])
+        self.assertTrue(self.library.transactions[0]['returned'])
+        self.assertNotIn(1, self.library.open_transactions)
+        
+        # Verify no fees for returned books
+        result = self.library.calculate_and_process_overdue_fees_with_notifications_and_updates(1, datetime.datetime.now())
+        self.assertEqual(result['total_fee'], 0)
+    
+    def test_batch_overdue_billing_matches_per_member_billing(self):
+        """
+        Test that batch billing gives the same fees as billing each member.
+        Verifies every fee tier, overdue_fees and system_stats.
+        """
+        now = datetime.datetime(2025, 10, 1)
+        batch_library = LibraryManagementSystem()
+        for library in (self.library, batch_library):
+            library.add_book("Batch Book", "Author B", "978-1616161616", "Science", 10)
+            for name in ("Ann", "Ben", "Cal"):
+                library.register_member(name, f"{name}@email.com", "555-1616", "16 Batch St", "Regular")
+            # 3, 10, 20 and 45 days overdue, plus one loan that is not due yet
+            for member_id, days in ((1, 3), (1, 10), (2, 20), (2, 45), (3, -2)):
+                due_date = now - datetime.timedelta(days=days)
+                library.process_book_checkout(member_id, "978-1616161616", due_date, due_date, "Staff F", "Desk 6")
+        
+        expected = {}
+        for member_id in (1, 2, 3):
+            result = self.library.calculate_and_process_overdue_fees_with_notifications_and_updates(member_id, now)
+            if result['overdue_books']:
+                expected[member_id] = (result['total_fee'], result['overdue_books'])
+        
+        results = batch_library.process_overdue_fees_for_all_members(now)
+        
+        # Verify per-member totals and breakdowns match the scalar path
+        self.assertEqual({m: (r['total_fee'], r['overdue_books']) for m, r in results.items()}, expected)
+        self.assertEqual(results[1]['total_fee'], 15 + 65)
+        self.assertEqual(results[2]['total_fee'], 195 + 645)
+        self.assertEqual(batch_library.overdue_fees, self.library.overdue_fees)
+        self.assertEqual(batch_library.system_stats, self.library.system_stats)
+        self.assertEqual(batch_library.notifications, self.library.notifications)
+
+    
+    @unittest.skipUnless(fee_engine, "numpy is not installed")
+    def test_bulk_fee_engine_matches_scalar_fees(self):
+        """
+        Property test: vectorized fees equal the scalar fee schedule.
+        Checks random and boundary day counts, including times of day.
+        """
+        rng = random.Random(2025)
+        return_date = datetime.datetime(2025, 10, 1, 12, 30)
+        due_dates = [return_date - datetime.timedelta(days=d) for d in (0, 1, 7, 8, 14, 15, 30, 31, -1)]
+        due_dates += [return_date - datetime.timedelta(seconds=rng.randint(-10**6, 10**7)) for _ in range(2000)]
+        
+        result = fee_engine.compute_overdue_fees_bulk(due_dates, return_date)
+        
+        for i, due_date in enumerate(due_dates):
+            days = (return_date - due_date).days
+            self.assertEqual(int(result['days_overdue'][i]), days)
+            self.assertEqual(int(result['fees'][i]), calculate_overdue_fee(days) if days > 0 else 0)
+    
+    @unittest.skipUnless(fee_engine, "numpy is not installed")
+    def test_bulk_fee_engine_matches_overdue_fee_method(self):
+        """
+        Property test: per-member bulk totals equal the existing overdue-fee method.
+        Uses a random library of members and open loans.
+        """
+        rng = random.Random(7)
+        return_date = datetime.datetime(2025, 10, 1)
+        self.library.add_book("Bulk Book", "Author Z", "978-1717171717", "Science", 10**6)
+        for i in range(20):
+            self.library.register_member(f"Member {i}", "m@email.com", "555-1717", "17 Bulk St", "Regular")
+        for _ in range(300):
+            due_date = return_date - datetime.timedelta(hours=rng.randint(-200, 2000))
+            self.library.process_book_checkout(rng.randint(1, 20), "978-1717171717", due_date, due_date, "Staff G", "Desk 7")
+        
+        bulk = fee_engine.compute_library_fees(self.library, return_date)
+        totals = dict(zip(bulk['member_ids'].tolist(), bulk['member_totals'].tolist()))
+        
+        for member_id in range(1, 21):
+            result = self.library.calculate_and_process_overdue_fees_with_notifications_and_updates(member_id, return_date)
+            self.assertEqual(totals.get(member_id, 0), result['total_fee'])
+
+    
+    def test_notifications_are_counted_per_member(self):
+        """
+        Test that notifications_sent counts only the member's own notifications.
+        Member 1 must not be credited with member 11's messages.
+        """
+        now = datetime.datetime.now()
+        self.library.add_book("Notify Book", "Author N", "978-1818181818", "Drama", 20)
+        for i in range(1, 12):
+            self.library.register_member(f"User {i}", "n@email.com", "555-1818", "18 Notify St", "Regular")
+        due_date = now - datetime.timedelta(days=40)
+        self.library.process_book_checkout(11, "978-1818181818", due_date, due_date, "Staff H", "Desk 8")
+        self.library.process_book_checkout(1, "978-1818181818", due_date, due_date, "Staff H", "Desk 8")
+        
+        self.library.calculate_and_process_overdue_fees_with_notifications_and_updates(11, now)
+        result = self.library.calculate_and_process_overdue_fees_with_notifications_and_updates(1, now)
+        
+        # Verify one regular and one urgent notification each
+        self.assertEqual(result['notifications_sent'], 2)
+        self.assertEqual(self.library.count_notifications_sent(11), 2)
+        self.assertEqual(len(self.library.get_member_notifications(1)), 1)
+        self.assertIn("URGENT", self.library.get_member_notifications(1, urgent=True)[0])
+        self.assertEqual(len(self.library.notifications), 4)
+    
+    def test_notification_retention_is_bounded(self):
+        """
+        Test that per-member queues and the global log keep only recent messages.
+        Verifies the sent counter still covers the whole history.
+        """
+        library = LibraryManagementSystem(notification_retention=3, notification_log_size=5)
+        for i in range(10):
+            library.notify(1, f"message {i}")
+        library.notify(2, "urgent message", urgent=True)
+        
+        self.assertEqual(library.get_member_notifications(1), ["message 7", "message 8", "message 9"])
+        self.assertEqual(library.count_notifications_sent(1), 10)
+        self.assertEqual(library.get_member_notifications(2, urgent=True), ["urgent message"])
+        self.assertEqual(library.get_member_notifications(2), [])
+        self.assertEqual(len(library.notifications), 5)
+
+    
+    def test_search_is_case_insensitive(self):
+        """
+        Test that author and category searches ignore case.
+        Verifies empty searches still return None.
+        """
+        self.library.add_book("Case Book", "Mixed Case", "978-1919191919", "Sci-Fi", 1)
+        
+        self.assertEqual(len(search_books_by_author(self.library, "MIXED case")), 1)
+        self.assertEqual(len(search_books_by_category(self.library, "sci-fi")), 1)
+        self.assertIsNone(search_books_by_author(self.library, "Nobody"))
+        self.assertIsNone(search_books_by_category(self.library, "Poetry"))
+    
+    def test_search_prefix_token_and_pagination(self):
+        """
+        Test prefix and token search modes and lazy paging of results.
+        Verifies pages follow insertion order.
+        """
+        for i in range(5):
+            self.library.add_book(f"Page Book {i}", "Ada Lovelace", f"978-20000000{i:02d}", "Mathematics", 1)
+        self.library.add_book("Other", "Adam Smith", "978-2000000099", "Economics", 1)
+        
+        # Prefix matches both authors starting with "ada"
+        self.assertEqual(len(list(search_books(self.library, 'author', "ADA", mode='prefix'))), 6)
+        
+        # Token matches any author containing the word
+        token_results = list(search_books(self.library, 'author', "lovelace", mode='token'))
+        self.assertEqual(len(token_results), 5)
+        self.assertEqual(list(search_books(self.library, 'author', "smith adam", mode='token')),
+                         ["Other by Adam Smith (ISBN: 978-2000000099)"])
+        
+        # Pagination
+        page = list(search_books(self.library, 'category', "mathematics", offset=2, limit=2))
+        self.assertEqual(page, token_results[2:4])
+        
+        # Keys added after a prefix query are found by the next one
+        self.library.add_book("Late Book", "Adair Jones", "978-2000000100", "Mathematics", 1)
+        self.assertEqual(len(list(search_books(self.library, 'author', "ada", mode='prefix'))), 7)
+        
+        # Unknown fields and modes are errors, not silent fallbacks
+        with self.assertRaises(ValueError):
+            search_books(self.library, 'title', "Other")
+        with self.assertRaises(ValueError):
+            search_books(self.library, 'author', "Ada", mode='fuzzy')
+
+    
+    def test_sqlite_storage_survives_restart(self):
+        """
+        Test that a library backed by SQLite reloads its state after a restart.
+        Verifies books, members, loans, returns and overdue fees persist.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            db_path = os.path.join(directory, "library.db")
+            storage = SQLiteStorage(db_path)
+            library = LibraryManagementSystem(storage=storage)
+            library.add_books([("Stored Book", "Author S", "978-2121212121", "Science", 2),
+                               ("Kept Book", "Author K", "978-2222222200", "History", 1)])
+            library.register_member("Stored User", "s@email.com", "555-2121", "21 Store St", "Student")
+            due_date = datetime.datetime(2025, 9, 1)
+            library.process_book_checkout(1, "978-2121212121", due_date, due_date, "Staff I", "Desk 9")
+            library.process_book_checkout(1, "978-2222222200", due_date, due_date, "Staff I", "Desk 9")
+            library.process_book_return(1, "978-2222222200")
+            library.calculate_and_process_overdue_fees_with_notifications_and_updates(1, datetime.datetime(2025, 9, 4))
+            storage.close()
+            
+            storage = SQLiteStorage(db_path)
+            restarted = LibraryManagementSystem(storage=storage)
+            
+            # Verify reloaded state and indexes
+            self.assertEqual([b['available'] for b in restarted.books], [1, 1])
+            self.assertEqual(restarted.members[0]['borrowed_books'], ["978-2121212121"])
+            self.assertEqual(restarted.members[0]['name'], "Stored User")
+            self.assertEqual([t['returned'] for t in restarted.transactions], [False, True])
+            self.assertEqual(restarted.transactions[0]['due_date'], due_date)
+            self.assertEqual(restarted.overdue_fees, {1: 15})
+            self.assertEqual(restarted.system_stats, {'overdue_count': 1})
+            self.assertEqual(len(search_books_by_category(restarted, "science")), 1)
+            
+            # Verify the reloaded library keeps writing through
+            self.assertTrue(restarted.process_book_checkout(1, "978-2121212121", due_date, due_date, "Staff I", "Desk 9"))
+            storage.close()
+            storage = SQLiteStorage(db_path)
+            self.assertEqual(LibraryManagementSystem(storage=storage).books[0]['available'], 0)
+            storage.close()
+    
+    def test_sqlite_storage_handles_loan_id_gaps(self):
+        """
+        Test a database whose loan ids are not 1..N (a loan row was deleted).
+        Verifies returns mark the right row and new checkouts still insert.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            db_path = os.path.join(directory, "library.db")
+            storage = SQLiteStorage(db_path)
+            library = LibraryManagementSystem(storage=storage)
+            library.add_books([("Gap Book", "Author G", "978-2323232323", "Science", 3),
+                               ("Gone Book", "Author H", "978-2424242424", "History", 1)])
+            library.register_member("Gap User", "g@email.com", "555-2323", "23 Gap St", "Student")
+            due_date = datetime.datetime(2025, 9, 1)
+            for isbn in ("978-2424242424", "978-2323232323", "978-2323232323"):
+                library.process_book_checkout(1, isbn, due_date, due_date, "Staff J", "Desk 2")
+            storage.conn.execute("DELETE FROM transactions WHERE id = 1")
+            storage.conn.commit()
+            storage.close()
+            
+            storage = SQLiteStorage(db_path)
+            restarted = LibraryManagementSystem(storage=storage)
+            self.assertTrue(restarted.process_book_return(1, "978-2323232323"))
+            self.assertTrue(restarted.process_book_checkout(1, "978-2323232323", due_date, due_date, "Staff J", "Desk 2"))
+            rows = list(storage.conn.execute("SELECT id, returned FROM transactions ORDER BY id"))
+            storage.close()
+            
+            self.assertEqual(rows, [(2, 1), (3, 0), (4, 0)])
+
+    
+    def test_compact_records_keep_dict_style_access(self):
+        """
+        Test that slotted book/member records behave like the original dicts.
+        Verifies item access, assignment, membership, get and equality.
+        """
+        self.library.add_book("Slot Book", "Slot Author", "978-2323232323", "Drama", 2)
+        book = self.library.books[0]
+        
+        book['available'] -= 1
+        self.assertEqual(book['available'], 1)
+        self.assertIn('category', book)
+        self.assertIsNone(book.get('missing'))
+        self.assertEqual(book, {'title': "Slot Book", 'author': "Slot Author", 'isbn': "978-2323232323",
+                                'category': "Drama", 'copies': 2, 'available': 1})
+        with self.assertRaises(KeyError):
+            book['missing']
+    
+    def test_transaction_log_round_trips_values(self):
+        """
+        Test that the columnar transaction log returns exactly what was stored.
+        Verifies packed dates, overflow values and shared row views.
+        """
+        log = TransactionLog()
+        aware = datetime.datetime(2025, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc)
+        naive = datetime.datetime(1969, 12, 31, 23, 59, 59, 999999)
+        log.append({'member_id': 7, 'isbn': "978-2424242424", 'checkout_date': naive, 'due_date': aware,
+                    'staff_name': "Staff J", 'location': "Desk 10", 'returned': False})
+        log.append({'member_id': 8, 'isbn': "978-2424242424", 'checkout_date': datetime.date(2025, 1, 1),
+                    'due_date': naive, 'staff_name': "Staff J", 'location': "Desk 10", 'returned': False})
+        
+        self.assertEqual(log[0]['checkout_date'], naive)
+        self.assertEqual(log[0]['due_date'], aware)
+        self.assertEqual(log[1]['checkout_date'], datetime.date(2025, 1, 1))
+        self.assertEqual(log[-1]['member_id'], 8)
+        self.assertEqual(len(log.strings['isbn'].values), 1)
+        
+        # Writes through one view are seen by every view of the row
+        view = log[0]
+        view['returned'] = True
+        self.assertTrue(log[0]['returned'])
+        self.assertEqual(view, log[0])
+
+    
+    def test_concurrent_checkouts_never_oversell(self):
+        """
+        Test checkout and return from many threads at once.
+        Verifies no copy is lent twice and loans, members and books agree.
+        """
+        isbns = [f"978-25{i:08d}" for i in range(4)]
+        for isbn in isbns:
+            self.library.add_book("Busy Book", "Busy Author", isbn, "Fiction", 3)
+        self.library.register_members([(f"Member {i}", None, None, None, "Regular") for i in range(16)])
+        checkout_date = datetime.datetime(2025, 1, 1)
+        due_date = checkout_date + datetime.timedelta(days=14)
+        successes = []
+        start = threading.Barrier(16)
+        
+        def worker(member_id):
+            rng = random.Random(member_id)
+            start.wait()
+            for _ in range(1000):
+                isbn = rng.choice(isbns)
+                if self.library.process_book_checkout(member_id, isbn, checkout_date, due_date, "Staff", "Desk"):
+                    successes.append(isbn)
+                    if rng.random() < 0.5:
+                        self.library.process_book_return(member_id, isbn)
+        
+        # Switch threads as often as possible so unsynchronized updates would race
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [threading.Thread(target=worker, args=(member_id,)) for member_id in range(1, 17)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+        
+        self.assertEqual(len(self.library.transactions), len(successes))
+        open_loans = [t for t in self.library.transactions if not t['returned']]
+        borrowed = [isbn for member in self.library.members for isbn in member['borrowed_books']]
+        self.assertEqual(sorted(borrowed), sorted(t['isbn'] for t in open_loans))
+        for book in self.library.books:
+            lent = sum(1 for t in open_loans if t['isbn'] == book['isbn'])
+            self.assertGreaterEqual(book['available'], 0)
+            self.assertEqual(book['copies'] - book['available'], lent)
+    
+    def test_overdue_notifications_are_delivered_asynchronously(self):
+        """
+        Test the notification pipeline against a local SMTP stand-in.
+        Verifies billing only queues deliveries and the workers send them.
+        """
+        self.library.add_book("Late Book", "Late Author", "978-2626262626", "Fiction", 2)
+        self.library.register_member("Mail Reader", "reader@test.com", "555-0001", "1 Mail St", "Regular")
+        self.library.register_member("No Mail", None, "555-0002", "2 Mail St", "Regular")
+        checkout_date = datetime.datetime(2025, 1, 1)
+        for member_id in (1, 2):
+            self.library.process_book_checkout(member_id, "978-2626262626", checkout_date,
+                                               checkout_date + datetime.timedelta(days=14), "Staff", "Desk")
+        
+        async def scenario():
+            received = []
+            server = await start_smtp_stand_in(received)
+            port = server.sockets[0].getsockname()[1]
+            transport = SMTPTransport('127.0.0.1', port, "library@test.com",
+                                      lambda member_id: self.library.members_by_id[member_id]['email'])
+            pipeline = DeliveryPipeline(transport, workers=2, batch_size=10)
+            await pipeline.start()
+            self.library.delivery = pipeline
+            
+            self.library.process_overdue_fees_for_all_members(checkout_date + datetime.timedelta(days=60))
+            queued = [delivery['status'] for delivery in pipeline.deliveries]
+            await pipeline.stop()
+            server.close()
+            await server.wait_closed()
+            return pipeline, queued, received
+        
+        pipeline, queued, received = asyncio.run(scenario())
+        
+        # Billing returned before anything was delivered
+        self.assertEqual(queued, ['queued'] * 4)
+        statuses = {(d['member_id'], d['status']) for d in pipeline.deliveries}
+        self.assertEqual(statuses, {(1, 'sent'), (2, 'failed')})
+        self.assertEqual(pipeline.status_counts['sent'], 2)
+        self.assertEqual(len(received), 2)
+        self.assertTrue(any("URGENT" in body for body in received))
+    
+    def test_delivery_retries_and_drops_when_full(self):
+        """
+        Test retry with backoff, permanent failure and the bounded queue.
+        Verifies attempts are recorded and overflow is dropped, not blocked on.
+        """
+        async def deliver(transport, count, **options):
+            pipeline = DeliveryPipeline(transport, backoff=0, **options)
+            await pipeline.start()
+            deliveries = [pipeline.submit(1, f"Notice {i}") for i in range(count)]
+            await pipeline.stop()
+            return deliveries
+        
+        deliveries = asyncio.run(deliver(FlakyTransport(2), 1, max_attempts=3))
+        self.assertEqual((deliveries[0]['status'], deliveries[0]['attempts']), ('sent', 3))
+        
+        deliveries = asyncio.run(deliver(FlakyTransport(5), 1, max_attempts=2))
+        self.assertEqual(deliveries[0]['status'], 'failed')
+        self.assertIn("transport unavailable", deliveries[0]['error'])
+        
+        deliveries = asyncio.run(deliver(FlakyTransport(0), 3, queue_size=1))
+        self.assertEqual([d['status'] for d in deliveries], ['sent', 'dropped', 'dropped'])
+    
+    def test_delivery_retries_only_unsent_and_survives_errors(self):
+        """
+        Test partial batches, unexpected transport errors and early submits.
+        Verifies nothing is sent twice and a failing batch does not stop the workers.
+        """
+        async def deliver(transport, count, **options):
+            pipeline = DeliveryPipeline(transport, workers=1, backoff=0, **options)
+            await pipeline.start()
+            deliveries = [pipeline.submit(1, f"Notice {i}") for i in range(count)]
+            await asyncio.wait_for(pipeline.stop(), 5)
+            return deliveries
+        
+        transport = FlakyTransport(1, partial=2)
+        deliveries = asyncio.run(deliver(transport, 5, batch_size=5))
+        self.assertEqual([d['status'] for d in deliveries], ['sent'] * 5)
+        self.assertEqual([d['attempts'] for d in deliveries], [1, 1, 2, 2, 2])
+        self.assertEqual([d['message'] for d in transport.sent], [f"Notice {i}" for i in range(5)])
+        
+        deliveries = asyncio.run(deliver(BrokenTransport(), 4, batch_size=2))
+        self.assertEqual([d['status'] for d in deliveries], ['failed', 'failed', 'sent', 'sent'])
+        self.assertIn("KeyError", deliveries[0]['error'])
+        
+        pipeline = DeliveryPipeline(FlakyTransport(0))
+        delivery = pipeline.submit(1, "Too early")
+        self.assertEqual(delivery['status'], 'dropped')
+        self.assertEqual(pipeline.status_counts['dropped'], 1)
+    
+    def test_bulk_import_streams_and_reports_rejects(self):
+        """
+        Test importing books from CSV and members from JSONL in small batches.
+        Verifies valid rows land in every map and bad rows are reported.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            books_path = os.path.join(directory, "books.csv")
+            with open(books_path, 'w', encoding='utf-8') as f:
+                f.write("title,author,isbn,category,copies\n")
+                f.write("Book A,Author A,978-2727272701,Fiction,2\n")
+                f.write("Book B,Author B,978-2727272702,Science,many\n")
+                f.write("Book C,Author A,978-2727272703,Fiction,1\n")
+                f.write(",Author D,978-2727272704,Fiction,1\n")
+                f.write("Book E,Author E,978-2727272705,Science,3\n")
+            members_path = os.path.join(directory, "members.jsonl")
+            with open(members_path, 'w', encoding='utf-8') as f:
+                f.write('{"name": "Ann", "email": "ann@test.com", "member_type": "Student"}\n')
+                f.write('{"name": "Ben", "email": "not-an-email", "member_type": "Student"}\n')
+                f.write('{"name": "Cal", "member_type": \n')
+                f.write('\n')
+                f.write('{"name": "Dee", "phone": "555-0004", "member_type": "Faculty"}\n')
+            rejects_path = os.path.join(directory, "rejects.jsonl")
+            
+            book_report = import_books(self.library, books_path, batch_size=2, rejects_path=rejects_path)
+            member_report = import_members(self.library, members_path, batch_size=2)
+            with open(rejects_path, encoding='utf-8') as f:
+                rejected_lines = f.readlines()
+        
+        self.assertEqual((book_report.imported, book_report.rejected_count), (3, 2))
+        self.assertEqual([line for line, _ in book_report.rejected], [3, 5])
+        self.assertIn("invalid copies", book_report.rejected[0][1])
+        self.assertEqual(len(rejected_lines), 2)
+        self.assertEqual([b['title'] for b in self.library.book_categories["Fiction"]], ["Book A", "Book C"])
+        self.assertEqual(len(self.library.book_categories["Science"]), 1)
+        self.assertEqual(search_books_by_author(self.library, "author a"),
+                         ["Book A by Author A (ISBN: 978-2727272701)", "Book C by Author A (ISBN: 978-2727272703)"])
+        
+        self.assertEqual((member_report.imported, member_report.rejected_count), (2, 2))
+        self.assertEqual([line for line, _ in member_report.rejected], [2, 3])
+        self.assertEqual(self.library.member_types, {1: "Student", 2: "Faculty"})
+        self.assertIsNone(self.library.members_by_id[2]['email'])
+    
+    def test_bulk_member_reports_stream_with_filter(self):
+        """
+        Test streaming every member's report to a writer.
+        Verifies output matches the per-member report and the type filter.
+        """
+        self.library.register_members([
+            ("Stream One", "one@test.com", "555-0011", "11 Stream St", "Student"),
+            ("Stream Two", None, "555-0012", "12 Stream St", "Faculty"),
+            ("Stream Three", "three@test.com", None, "13 Stream St", "Student"),
+        ])
+        
+        out = io.StringIO()
+        written = self.library.write_member_reports(out)
+        
+        self.assertEqual(written, 3)
+        self.assertEqual(out.getvalue(), "".join(self.library.generate_member_report(m) for m in (1, 2, 3)))
+        self.assertIn("Email: None\n", out.getvalue())
+        
+        students = list(self.library.iter_member_reports(member_type="Student"))
+        self.assertEqual(students, [self.library.generate_member_report(1), self.library.generate_member_report(3)])
+        self.assertEqual(list(self.library.iter_member_reports(member_type="Staff")), [])
+    
+    def test_operation_log_restores_snapshot_and_tail(self):
+        """
+        Test restarting from a snapshot plus the operations logged after it.
+        Verifies books, members, loans, fees and stats match the pre-restart state.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            storage = OperationLog(directory, snapshot_every=0)
+            library = LibraryManagementSystem(storage=storage)
+            library.add_books([("Log Book", "Log Author", "978-2828282801", "Fiction", 2),
+                               ("Tail Book", "Tail Author", "978-2828282802", "Science", 1)])
+            library.register_members([("Log One", "one@log.com", None, None, "Student"),
+                                      ("Log Two", "two@log.com", None, None, "Faculty")])
+            checkout_date = datetime.datetime(2025, 1, 1)
+            due_date = checkout_date + datetime.timedelta(days=14)
+            library.process_book_checkout(1, "978-2828282801", checkout_date, due_date, "Staff", "Desk")
+            library.calculate_and_process_overdue_fees_with_notifications_and_updates(
+                1, checkout_date + datetime.timedelta(days=20))
+            storage.snapshot()
+            
+            # Only these operations are in the log after the snapshot
+            library.register_member("Log Three", None, None, None, "Regular")
+            library.process_book_checkout(2, "978-2828282801", checkout_date, due_date, "Staff", "Desk")
+            library.process_book_checkout(3, "978-2828282802", checkout_date, datetime.date(2025, 1, 10),
+                                          "Staff", "Desk")
+            library.process_book_return(1, "978-2828282801")
+            library.calculate_and_process_overdue_fees_with_notifications_and_updates(
+                2, checkout_date + datetime.timedelta(days=40))
+            storage.close()
+            self.assertEqual(sorted(os.listdir(directory)), ["oplog.1.bin", "snapshot.bin"])
+            
+            restored = LibraryManagementSystem(storage=OperationLog(directory))
+            restored.storage.close()
+        
+        self.assertEqual([b.to_dict() for b in restored.books], [b.to_dict() for b in library.books])
+        self.assertEqual([m.to_dict() for m in restored.members], [m.to_dict() for m in library.members])
+        self.assertEqual([t.to_dict() for t in restored.transactions], [t.to_dict() for t in library.transactions])
+        self.assertEqual(restored.overdue_fees, library.overdue_fees)
+        self.assertEqual(restored.system_stats, {'overdue_count': 2})
+        self.assertEqual(restored.member_types, library.member_types)
+        self.assertEqual(sorted(restored.open_transactions), [2, 3])
+    
+    def test_operation_log_group_commit_and_torn_tail(self):
+        """
+        Test that concurrent writers share an fsync and a torn tail is dropped.
+        Verifies a lone writer never lingers and the intact records survive.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            storage = OperationLog(directory, group_size=8, commit_interval=60, snapshot_every=0)
+            library = LibraryManagementSystem(storage=storage)
+            
+            # Nobody else is writing, so each add is synced at once
+            for i in range(4):
+                library.add_book(f"Group Book {i}", "Group Author", f"978-29292929{i:02d}", "Fiction", 1)
+            self.assertEqual(storage.syncs, 4)
+            
+            # Eight writers queued behind the log lock are covered by one fsync
+            members = [Member(id=100 + i, name=f"Group Member {i}", email=None, phone=None, address=None,
+                              member_type="Regular", borrowed_books=[], registration_date=None) for i in range(8)]
+            with storage.lock:
+                threads = [threading.Thread(target=storage.insert_members, args=([member],)) for member in members]
+                for thread in threads:
+                    thread.start()
+                while storage.arriving < len(threads):
+                    time.sleep(0.001)
+            for thread in threads:
+                thread.join()
+            self.assertEqual(storage.syncs, 5)
+            storage.close()
+            
+            log_path = os.path.join(directory, "oplog.0.bin")
+            intact_size = os.path.getsize(log_path)
+            with open(log_path, 'ab') as f:
+                f.write(b"\x40\x00\x00\x00torn")
+            
+            storage = OperationLog(directory)
+            restored = LibraryManagementSystem(storage=storage)
+            self.assertEqual(os.path.getsize(log_path), intact_size)
+            restored.add_book("After Crash", "Group Author", "978-2929292999", "Fiction", 1)
+            storage.close()
+            
+            restored = LibraryManagementSystem(storage=OperationLog(directory))
+            restored.storage.close()
+        
+        self.assertEqual(len(restored.books), 5)
+        self.assertEqual(restored.books[-1]['title'], "After Crash")
+        self.assertEqual(sorted(m['id'] for m in restored.members), list(range(100, 108)))
+    
+    def test_operation_log_is_durable_without_close(self):
+        """
+        Test restarting from a directory whose log was never closed.
+        Verifies returned calls are on disk and background snapshots replace old logs.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            storage = OperationLog(directory, snapshot_every=5)
+            library = LibraryManagementSystem(storage=storage)
+            library.add_book("Durable Book", "Durable Author", "978-3030303030", "Fiction", 3)
+            library.register_member("Durable One", None, None, None, "Student")
+            
+            crashed = LibraryManagementSystem(storage=OperationLog(directory))
+            self.assertEqual([b['title'] for b in crashed.books], ["Durable Book"])
+            self.assertEqual([m['name'] for m in crashed.members], ["Durable One"])
+            crashed.storage.close()
+            
+            for i in range(10):
+                library.register_member(f"Durable {i}", None, None, None, "Regular")
+            storage.close()
+            self.assertEqual(sorted(os.listdir(directory))[-1], "snapshot.bin")
+            self.assertNotIn("oplog.0.bin", os.listdir(directory))
+            
+            restored = LibraryManagementSystem(storage=OperationLog(directory))
+            restored.storage.close()
+        
+        self.assertEqual(len(restored.members), 11)
+
 
 def run_tests_with_summary():
     """